@@ -1,25 +1,294 @@
 import os
-import google.generativeai as genai
+import asyncio
+import time
 import json
-from dotenv import load_dotenv
+import re
+import config  # noqa: F401  (loads .env)
+from request_context import get_request_context
+from cache import ResponseCache, normalize_key
+from load_shedding import LoadShedder
+from resilience import ResilientCaller, CircuitOpenError
+from client_pool import ClientPool
+from question_bank import question_bank, clean_topic, format_questions
+from plan_cache import profile_ranges, placeholder_values, fill_placeholders, to_template
+import metrics
+import logic
 
-# Load environment variables
-from pathlib import Path
-env_path = Path(__file__).parent / '.env'
-load_dotenv(dotenv_path=env_path)
+VALID_INTENTS = ["study_planning", "practice_questions", "stress_relief", "general_chat"]
+# Intents whose reply classify_and_respond drafts itself
+REPLY_INTENTS = ("stress_relief", "general_chat")
+# Tolerates decorated first lines such as "**Intent:** general_chat"
+INTENT_RE = re.compile("|".join(VALID_INTENTS))
+
+def _split_intent_line(text: str) -> tuple:
+    """("intent", "reply") from "<intent>\\n<reply>" output; intent is None if the first line isn't one."""
+    first, _, rest = text.lstrip().partition("\n")
+    match = INTENT_RE.search(first.lower())
+    return (match.group(0) if match else None), rest.strip()
+
+class _ReplyAfterIntent:
+    """
+    Token sink for classify_and_respond: holds chunks back until the intent
+    line is complete, then forwards the rest only for intents that reply.
+    """
+    def __init__(self, sink):
+        self.sink = sink
+        self.head = ""
+        self.forward = None
+
+    async def put(self, text: str):
+        if self.forward is None:
+            self.head += text
+            if "\n" not in self.head.lstrip():
+                return
+            intent, _ = _split_intent_line(self.head)
+            self.forward = intent in REPLY_INTENTS
+            text = self.head.lstrip().partition("\n")[2].lstrip()
+        if self.forward and text:
+            await self.sink.put(text)
+
+class _FillPlaceholders:
+    """
+    Token sink for plan templates: fills the {placeholders} in streamed text,
+    holding back a chunk tail that may be the start of one split across chunks.
+    """
+    def __init__(self, sink, values: dict):
+        self.sink = sink
+        self.values = values
+        self.pending = ""
+
+    async def put(self, text: str):
+        text = self.pending + text
+        self.pending = ""
+        cut = text.rfind("{")
+        if cut != -1 and "}" not in text[cut:] and len(text) - cut < 20:
+            text, self.pending = text[:cut], text[cut:]
+        if text:
+            await self.sink.put(fill_placeholders(text, self.values))
+
+    async def flush(self):
+        if self.pending:
+            text, self.pending = self.pending, ""
+            await self.sink.put(fill_placeholders(text, self.values))
 
 class AIAgent:
     def __init__(self):
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
+        # GOOGLE_API_KEYS (comma-separated) spreads calls over several keys
+        api_keys = [key.strip() for key in os.getenv("GOOGLE_API_KEYS", "").split(",") if key.strip()]
+        if not api_keys and os.getenv("GOOGLE_API_KEY"):
+            api_keys = [os.getenv("GOOGLE_API_KEY")]
+
+        self._api_keys = api_keys
+        self._model = None
+        self.pool = None
+        if not api_keys:
             print("⚠️ WARNING: GOOGLE_API_KEY not found in environment variables.")
-            self.model = None
         else:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-2.5-flash')
+            self.pool = ClientPool(api_keys)
+
+        # Caps how many Gemini requests this process keeps in flight at once.
+        # Calls beyond the cap wait here instead of piling onto the upstream.
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+        self._llm_slots = asyncio.Semaphore(self.max_concurrency)
+
+        # Topic-keyed generations are shared across users
+        cache_options = dict(
+            max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")),
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+            max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+        )
+        self.practice_cache = ResponseCache("practice_questions", **cache_options)
+        self.stress_cache = ResponseCache("stress_relief", **cache_options)
+
+        # When Gemini is slow, failing or saturated, answers come from the
+        # deterministic generators in logic.py instead
+        self.shedder = LoadShedder()
+        # Per-attempt timeouts, retries, hedging and the circuit breaker
+        self.resilience = ResilientCaller()
+
+    @property
+    def model(self):
+        if self._model is None and self._api_keys:
+            # google.generativeai takes about a second to import, so it is
+            # loaded on first use (or by the warm-up in main.py), not at import
+            import google.generativeai as genai
+            genai.configure(api_key=self._api_keys[0])
+            self._model = genai.GenerativeModel(self.pool.default_model)
+        return self._model
+
+    @model.setter
+    def model(self, value):
+        # Assigning a model directly (e.g. loadtest's fake) sends every call
+        # to it and bypasses the key pool.
+        self._model = value
+        self.pool = None
 
     def is_configured(self):
-        return self.model is not None
+        return self._model is not None or bool(self._api_keys)
+
+    async def _generate(self, method: str, prompt: str, stream: bool = False, generation_config: dict = None) -> str:
+        """
+        Sends a prompt to Gemini without blocking the event loop.
+        Uses the SDK's async client, bounded by LLM_MAX_CONCURRENCY, with
+        retries, hedging and the circuit breaker from ResilientCaller.
+
+        `method` names the calling AIAgent method for metrics.
+        With stream=True and a streaming request in progress, chunks are
+        forwarded to the request's token sink as they arrive. The full text
+        is returned either way.
+        """
+        ctx = get_request_context()
+        streaming = bool(stream and ctx and ctx.streaming)
+        emitted = False
+
+        async def request(model):
+            nonlocal emitted
+            if not streaming:
+                response = await model.generate_content_async(prompt, generation_config=generation_config)
+                metrics.record_usage(method, prompt, response.text, response)
+                return response.text, response
+
+            response = await model.generate_content_async(prompt, stream=True)
+            parts = []
+            async for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. safety metadata only)
+                    continue
+                parts.append(text)
+                emitted = True
+                await ctx.emit(text)
+            text = "".join(parts)
+            # Usage metadata is filled in on the response once the stream is consumed
+            metrics.record_usage(method, prompt, text, response)
+            return text, response
+
+        async def attempt():
+            async with self._llm_slots:
+                if self.pool is None:
+                    text, _ = await request(self.model)
+                    return text
+                return await self._pooled_request(method, prompt, request, lambda: not emitted)
+
+        # Streamed calls are never hedged, and only retried until the first
+        # chunk reaches the client, so output is never duplicated.
+        return await self.resilience.call(
+            attempt,
+            budget=self._call_budget(),
+            method=method,
+            hedge=not streaming,
+            can_retry=lambda: not emitted,
+        )
+
+    async def _pooled_request(self, method: str, prompt: str, request, can_spill):
+        """
+        Runs `request(model)` on a key from the pool with the model chosen for
+        `method`. A 429 puts that key in cooldown and retries right away on the
+        next key, as long as `can_spill()` (nothing streamed yet).
+        """
+        est_tokens = len(prompt) / 4
+        tried = set()
+        while True:
+            slot = await self.pool.acquire(est_tokens, exclude=tried)
+            used_tokens = None
+            try:
+                text, response = await request(slot.model(self.pool.model_for(method)))
+                used_tokens = getattr(getattr(response, "usage_metadata", None), "total_token_count", None)
+                return text
+            except Exception as e:
+                if getattr(e, "code", None) != 429:
+                    raise
+                self.pool.report_rate_limited(slot)
+                tried.add(slot)
+                if len(tried) >= len(self.pool.slots) or not can_spill():
+                    raise
+            finally:
+                self.pool.release(slot, est_tokens, used_tokens)
+
+    def _call_budget(self) -> float:
+        """Seconds this call may take: the request's remaining budget, capped at DEGRADE_DEADLINE."""
+        ctx = get_request_context()
+        remaining = ctx.remaining() if ctx else None
+        if remaining is None:
+            return self.shedder.deadline
+        return min(self.shedder.deadline, remaining)
+
+    async def _guarded(self, method: str, primary, fallback):
+        """
+        Runs `primary()` (an LLM call) under the load shedder and a deadline
+        taken from the request budget. If the call is shed, times out, fails,
+        or the circuit breaker is open, returns `fallback()`
+        instead and tags the current request as degraded.
+        """
+        metrics.llm_calls.inc(method)
+        if self.shedder.should_shed():
+            return self._degrade(method, fallback)
+        budget = self._call_budget()
+        if budget <= 0:
+            # The request's budget is already spent: nothing is sent upstream,
+            # so this must not count as an upstream timeout in the shedder
+            return self._degrade(method, fallback)
+
+        self.shedder.inflight += 1
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(primary(), timeout=budget)
+        except CircuitOpenError:
+            # Failing fast: nothing reached the upstream, so nothing to record
+            return self._degrade(method, fallback)
+        except asyncio.TimeoutError:
+            self._record_failure(method, start, timed_out=True)
+            print(f"LLM call exceeded its {budget:.1f}s budget, serving degraded response")
+            return self._degrade(method, fallback)
+        except Exception as e:
+            self._record_failure(method, start)
+            print(f"LLM call failed, serving degraded response: {e}")
+            return self._degrade(method, fallback)
+        finally:
+            self.shedder.inflight -= 1
+        elapsed = time.monotonic() - start
+        self.shedder.record(elapsed, ok=True)
+        metrics.llm_duration.observe(elapsed, method)
+        return result
+
+    def _record_failure(self, method: str, start: float, timed_out: bool = False):
+        elapsed = time.monotonic() - start
+        self.shedder.record(elapsed, ok=False, timed_out=timed_out)
+        metrics.llm_duration.observe(elapsed, method)
+        metrics.llm_errors.inc(method)
+
+    def _degrade(self, method: str, fallback):
+        self.shedder.degraded += 1
+        metrics.llm_degraded.inc(method)
+        ctx = get_request_context()
+        if ctx:
+            ctx.degraded = True
+        return fallback()
+
+    async def warm_up(self):
+        """One minimal Gemini request, so the first user request doesn't set up the connection."""
+        if self.model:
+            await self._generate("warm_up", "Reply with OK.")
+
+    async def _cached_generate(self, method: str, cache: ResponseCache, key: str, prompt: str) -> str:
+        """
+        _generate behind `cache`. Cache hits and coalesced waiters never see the
+        streamed chunks, so the full text is emitted to them in one go.
+        """
+        generated = False
+
+        async def compute():
+            nonlocal generated
+            generated = True
+            return await self._generate(method, prompt, stream=True)
+
+        text = await cache.get_or_compute(normalize_key(key), compute)
+        if not generated:
+            ctx = get_request_context()
+            if ctx:
+                await ctx.emit(text)
+        return text
 
     async def detect_intent(self, message: str, previous_messages: list = None) -> str:
         """
@@ -29,28 +298,171 @@ class AIAgent:
         if not self.model:
             return "general_chat" # Fallback
 
+        history = ""
+        if previous_messages:
+            history = "\n        Recent conversation (oldest first, for context only):\n" + "\n".join(
+                f"        - {m}" for m in previous_messages
+            ) + "\n"
+
         prompt = f"""
         Analyze the following user message and classify the intent into EXACTLY ONE of these categories:
         - study_planning (if the user wants a schedule, plan, timetable, or advice on how to study)
         - practice_questions (if the user wants a quiz, specific questions, or to test their knowledge)
         - stress_relief (if the user expresses anxiety, stress, or asks for motivation)
         - general_chat (for greetings, thanks, or unclear queries)
-
+        {history}
         User Message: "{message}"
         
         Return ONLY the category name.
         """
         
-        try:
-            response = self.model.generate_content(prompt)
-            intent = response.text.strip().lower()
-            valid_intents = ["study_planning", "practice_questions", "stress_relief", "general_chat"]
-            if intent not in valid_intents:
+        async def classify():
+            intent = (await self._generate("detect_intent", prompt)).strip().lower()
+            if intent not in VALID_INTENTS:
                 return "general_chat"
             return intent
-        except Exception as e:
-            print(f"Error checking intent: {e}")
-            return "general_chat"
+
+        return await self._guarded("detect_intent", classify, lambda: logic.classify_intent_local(message)[0])
+
+    async def detect_intents_batch(self, messages: list) -> list:
+        """
+        Classifies many messages with one Gemini prompt (for /chat/batch).
+        Returns one intent per message; anything Gemini leaves out or gets
+        wrong falls back to the local scorer.
+        """
+        local = [logic.classify_intent_local(message)[0] for message in messages]
+        if not self.model or not messages:
+            return local
+
+        numbered = "\n".join(f"        {i}. {message[:500]!r}" for i, message in enumerate(messages, 1))
+        prompt = f"""
+        Classify each of the following user messages into EXACTLY ONE of these categories:
+        - study_planning (if the user wants a schedule, plan, timetable, or advice on how to study)
+        - practice_questions (if the user wants a quiz, specific questions, or to test their knowledge)
+        - stress_relief (if the user expresses anxiety, stress, or asks for motivation)
+        - general_chat (for greetings, thanks, or unclear queries)
+
+        Messages:
+{numbered}
+
+        Respond with JSON: {{"intents": ["<intent for message 1>", "<intent for message 2>", ...]}} with exactly {len(messages)} entries, in order.
+        """
+        async def classify_all():
+            raw = await self._generate("detect_intents_batch", prompt, generation_config={"response_mime_type": "application/json"})
+            intents = json.loads(raw).get("intents") or []
+            result = list(local)
+            for i, intent in enumerate(intents[:len(messages)]):
+                intent = str(intent).strip().lower()
+                if intent in VALID_INTENTS:
+                    result[i] = intent
+            return result
+
+        return await self._guarded("detect_intents_batch", classify_all, lambda: local)
+
+    async def classify_and_respond(self, message: str, context: str = "") -> tuple:
+        """
+        Classifies the message and drafts the reply in one call: the intent on
+        the first line, the reply after it. Returns (intent, reply). When the
+        request is streaming, the reply part is streamed as it is generated.
+        reply is None for study_planning and practice_questions, which have
+        their own nodes (data collection, the question bank), and whenever the
+        call fails.
+        """
+        if not self.model:
+            return "general_chat", None
+
+        prompt = f"""
+        You are StudyBot, a helpful and empathetic study companion.
+        First classify the user's message into EXACTLY ONE of these intents:
+        - study_planning (if the user wants a schedule, plan, timetable, or advice on how to study)
+        - practice_questions (if the user wants a quiz, specific questions, or to test their knowledge)
+        - stress_relief (if the user expresses anxiety, stress, or asks for motivation)
+        - general_chat (for greetings, thanks, or unclear queries)
+
+        Write the intent name alone on the first line. Then, on the following lines, the reply for that intent:
+        - study_planning or practice_questions: write nothing after the first line.
+        - stress_relief: 3 short, actionable stress relief tips or motivational quotes. Be empathetic and calm.
+        - general_chat: a helpful, encouraging, and concise response.
+        Use Markdown for formatting in the reply.
+
+        Context: {context}
+        User Message: "{message}"
+        """
+        async def classify_and_answer():
+            ctx = get_request_context()
+            sink = ctx.token_sink if ctx else None
+            if sink is not None:
+                ctx.token_sink = _ReplyAfterIntent(sink)
+            try:
+                text = await self._generate("classify_and_respond", prompt, stream=True)
+            finally:
+                # Unless the sink was detached meanwhile (closed WebSocket)
+                if sink is not None and isinstance(ctx.token_sink, _ReplyAfterIntent):
+                    ctx.token_sink = sink
+            intent, reply = _split_intent_line(text)
+            if intent is None:
+                return "general_chat", None
+            if intent not in REPLY_INTENTS:
+                reply = None
+            return intent, reply or None
+
+        return await self._guarded("classify_and_respond", classify_and_answer, lambda: (logic.classify_intent_local(message)[0], None))
+
+    async def extract_student_fields(self, message: str, fields: list) -> dict:
+        """
+        Structured-output extraction for the study-plan fields the local parser
+        missed. Only `fields` are asked for; returns {} when unavailable.
+        """
+        if not self.model or not fields:
+            return {}
+
+        prompt = f"""
+        Extract these fields from a student's message if they are stated or clearly implied:
+        - education_level: string, e.g. "High School", "College", "University"
+        - subjects_count: integer number of subjects
+        - study_hours: number of hours per day they can study
+        - exam_timeline: integer number of days until their exams start
+        - study_habit: string, e.g. "Consistent", "Last-minute", "Procrastinator"
+
+        Only include these keys: {", ".join(fields)}. Omit any key the message does not answer.
+        Message: "{message}"
+
+        Respond with JSON, e.g. {{"subjects_count": 4, "exam_timeline": 14}}
+        """
+        async def extract():
+            raw = await self._generate("extract_student_fields", prompt, generation_config={"response_mime_type": "application/json"})
+            result = json.loads(raw)
+            if not isinstance(result, dict):
+                return {}
+            return {key: value for key, value in result.items() if key in fields and value not in (None, "")}
+
+        return await self._guarded("extract_student_fields", extract, lambda: {})
+
+    async def summarize_conversation(self, previous_summary: str, messages: list, max_tokens: int) -> str:
+        """
+        Folds `messages` into `previous_summary` for the rolling conversation
+        summary. Returns None when unavailable so the caller can summarize locally.
+        """
+        if not self.model:
+            return None
+
+        transcript = "\n".join(f"- {m[:1000]}" for m in messages)
+        prompt = f"""
+        Update the running summary of a conversation between a student and StudyBot.
+        Current summary:
+        {previous_summary or "(empty)"}
+
+        New messages to fold in:
+        {transcript}
+
+        Return the updated summary as short bullet points, at most {max_tokens * 3} characters.
+        Keep facts about the student, their goals and topics discussed. Drop pleasantries.
+        """
+        return await self._guarded(
+            "summarize_conversation",
+            lambda: self._generate("summarize_conversation", prompt),
+            lambda: None,
+        )
 
     async def generate_response(self, message: str, context: str = "") -> str:
         """
@@ -66,27 +478,39 @@ class AIAgent:
         
         Provide a helpful, encouraging, and concise response. Use Markdown for formatting.
         """
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            return f"Sorry, I encountered an error: {str(e)}"
+        return await self._guarded(
+            "generate_response",
+            lambda: self._generate("generate_response", prompt, stream=True),
+            lambda: "Sorry, I'm a little overloaded right now. Please try again in a moment.",
+        )
 
-    async def generate_study_plan(self, student_data: dict) -> str:
+    async def generate_study_plan(self, student_data: dict) -> tuple:
         """
         Generates a personalized study plan based on student data.
+        Gemini writes it as a template for the student's profile bucket, with
+        placeholders for the exact values (filled in as it streams), so it can
+        be reused through plan_cache. Returns (plan, template); template is
+        None for the fallback plans from logic.py.
         """
         if not self.model:
-            return "Cannot generate plan without API key."
+            return self._degrade("generate_study_plan", lambda: (logic.generate_study_plan(student_data), None))
 
+        ranges = profile_ranges(student_data) or {}
         prompt = f"""
         Create a detailed, motivational study plan for a student with the following profile:
-        - Education Level: {student_data.get('education_level', 'Unknown')}
-        - Number of Subjects: {student_data.get('subjects_count', 'Unknown')}
-        - Available Study Hours/Day: {student_data.get('study_hours', 'Unknown')}
-        - Time until Exams: {student_data.get('exam_timeline', 'Unknown')}
+        - Education Level: {{education_level}}
+        - Number of Subjects: {{subjects_count}} ({ranges.get('subjects_count', 'unknown')})
+        - Available Study Hours/Day: {{study_hours}} ({ranges.get('study_hours', 'unknown')})
+        - Days until Exams: {{exam_timeline}} ({ranges.get('exam_timeline', 'unknown')})
         - Study Habit: {student_data.get('study_habit', 'Unknown')}
 
+        The plan is shared by every student with this profile. Write the placeholders
+        {{education_level}}, {{subjects_count}}, {{study_hours}} and {{exam_timeline}} exactly as shown,
+        braces included, wherever you mention those values; they are filled in for each student.
+        Never work out other numbers from them: no counts or numbers of days, weeks or months
+        (say "the first half of your preparation", not "Week 1" or "2 weeks"), no hour totals,
+        and no number of subjects per day. Give session and break lengths in minutes.
+
         Output a structured plan in Markdown. 
         formatting rules:
         - Use `##` for main sections.
@@ -103,26 +527,80 @@ class AIAgent:
         4. Specific advice for their study habit.
         
         """
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            return "Sorry, I couldn't generate a plan right now."
+        values = placeholder_values(student_data)
+
+        async def generate():
+            ctx = get_request_context()
+            sink = ctx.token_sink if ctx else None
+            filler = None
+            if sink is not None:
+                filler = ctx.token_sink = _FillPlaceholders(sink, values)
+            try:
+                text = await self._generate("generate_study_plan", prompt, stream=True)
+                # Unless the sink was detached meanwhile (closed WebSocket)
+                if filler is not None and ctx.token_sink is filler:
+                    await filler.flush()
+            finally:
+                if filler is not None and ctx.token_sink is filler:
+                    ctx.token_sink = sink
+            return fill_placeholders(text, values), to_template(text)
+
+        return await self._guarded(
+            "generate_study_plan",
+            generate,
+            lambda: (logic.generate_study_plan(student_data), None),
+        )
 
     async def generate_practice_questions(self, topic: str) -> str:
+        """
+        Serves questions from the local bank; only topics it covers poorly go
+        to Gemini, and the generated questions are added to the bank.
+        """
+        subject = clean_topic(topic) or topic
+        records = question_bank.lookup(subject)
+        if records:
+            text = format_questions(subject, records)
+            ctx = get_request_context()
+            if ctx:
+                await ctx.emit(text)
+            return text
+
         if not self.model:
             return "Cannot generate questions without API key."
 
         prompt = f"""
-        Generate 3 practice questions for the topic: "{topic}".
-        Format as a numbered list.
-        After the questions, provide the correct answers hidden or at the bottom.
+        Generate 5 practice questions for the topic: "{subject}".
+        Each question needs a short correct answer.
+
+        Respond with JSON: {{"questions": [{{"question": "<question>", "answer": "<answer>"}}]}}
         """
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            return "Sorry, I couldn't generate questions."
+        async def backfill():
+            raw = await self._generate("generate_practice_questions", prompt, generation_config={"response_mime_type": "application/json"})
+            items = json.loads(raw).get("questions") or []
+            records = [
+                {"topic": subject, "question": str(item["question"]).strip(), "answer": str(item.get("answer") or "").strip(), "source": "gemini"}
+                for item in items
+                if isinstance(item, dict) and item.get("question")
+            ]
+            if not records:
+                raise ValueError("No questions in Gemini reply")
+            await asyncio.to_thread(question_bank.add, records)
+            return format_questions(subject, records[:3])
+
+        async def cached_backfill():
+            # Concurrent requests for the same uncovered topic share one backfill
+            text = await self.practice_cache.get_or_compute(normalize_key(subject), backfill)
+            # Not streamed (structured output), so the reply is emitted in one go
+            ctx = get_request_context()
+            if ctx:
+                await ctx.emit(text)
+            return text
+
+        return await self._guarded(
+            "generate_practice_questions",
+            cached_backfill,
+            lambda: logic.generate_practice_questions(topic),
+        )
 
     async def generate_stress_relief_tips(self, message: str) -> str:
         if not self.model:
@@ -133,11 +611,11 @@ class AIAgent:
         Provide 3 short, actionable stress relief tips or motivational quotes.
         Be empathetic and calm.
         """
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            return "Take a deep breath. You've got this."
+        return await self._guarded(
+            "generate_stress_relief_tips",
+            lambda: self._cached_generate("generate_stress_relief_tips", self.stress_cache, message, prompt),
+            logic.generate_stress_relief,
+        )
 
 # Singleton instance
 ai_agent = AIAgent()
@@ -0,0 +1,80 @@
+"""
+Per-turn dispatch overhead benchmark.
+
+Replays interview, practice, stress and chat turns against an instant fake
+Gemini model, once through LangGraph (`get_app_graph().ainvoke`) and once through
+the direct dispatcher, and reports time per turn spent outside the nodes.
+
+    python bench_dispatch.py --turns 3000
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from loadtest import FakeGenerativeModel
+
+TURNS = [
+    "Can you make me a study plan?",
+    "College",
+    "4",
+    "3",
+    "14",
+    "Consistent",
+    "Give me a quiz on photosynthesis",
+    "I'm so stressed about exams",
+    "Thanks, that helps!",
+]
+
+async def run_mode(mode: str, turns: int) -> dict:
+    import graph
+    from request_context import RequestContext, run_with_context
+
+    graph.fast_dispatch = mode == "direct"
+    overheads, totals = [], []
+    for i in range(turns):
+        ctx = RequestContext()
+        start = time.perf_counter()
+        await run_with_context(ctx, graph.run_chat_workflow(TURNS[i % len(TURNS)], f"bench-{mode}-{i // len(TURNS)}"))
+        elapsed = time.perf_counter() - start
+        totals.append(elapsed)
+        overheads.append(max(0.0, elapsed - sum(seconds for _, seconds in ctx.trace)))
+
+    return {
+        "mode": mode,
+        "turns": turns,
+        "turn_mean_us": statistics.mean(totals) * 1e6,
+        "overhead_mean_us": statistics.mean(overheads) * 1e6,
+        "overhead_p50_us": statistics.median(overheads) * 1e6,
+    }
+
+async def main(args):
+    from ai_agent import ai_agent
+    ai_agent.model = FakeGenerativeModel(latency_ms=0, output_chars=200, seed=args.seed)
+    from question_bank import question_bank
+    question_bank.path = Path(tempfile.mkdtemp(prefix="bench-bank-"))
+    from plan_cache import plan_cache
+    plan_cache.path = str(Path(tempfile.mkdtemp(prefix="bench-plans-")) / "plan_cache.db")
+
+    # Warm-up so imports, caches and the compiled graph do not count
+    for mode in ("langgraph", "direct"):
+        await run_mode(mode, len(TURNS) * 5)
+
+    results = [await run_mode(mode, args.turns) for mode in ("langgraph", "direct")]
+    from db import plan_writer
+    await plan_writer.close()
+
+    print(f"{'mode':<10} {'turns':>6} {'turn us':>10} {'overhead us':>12} {'p50 us':>10}")
+    for r in results:
+        print(f"{r['mode']:<10} {r['turns']:>6} {r['turn_mean_us']:>10.1f} {r['overhead_mean_us']:>12.1f} {r['overhead_p50_us']:>10.1f}")
+    base, fast = results
+    if fast["overhead_mean_us"] > 0:
+        print(f"overhead reduction: {base['overhead_mean_us'] / fast['overhead_mean_us']:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-turn graph dispatch overhead.")
+    parser.add_argument("--turns", type=int, default=2000, help="turns per mode")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
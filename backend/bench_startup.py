@@ -0,0 +1,80 @@
+"""
+Cold-start benchmark: how long `import main` takes in a fresh interpreter.
+
+Each run is a new subprocess, so nothing is cached in-process. It also
+checks that the heavy SDKs stay out of the import path (they load lazily or
+in the startup warm-up).
+
+    python bench_startup.py --runs 5
+    python bench_startup.py --max-ms 1500   # non-zero exit on regression (CI)
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Must not be imported by `import main`
+LAZY_MODULES = ["google.generativeai", "langgraph"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "import_ms": elapsed * 1000,
+    "eager": [name for name in %r if name in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+def run_probe() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=Path(__file__).parent, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def slowest_imports(limit: int = 10) -> list:
+    """(cumulative ms, module) for the top-level imports under `import main`, from -X importtime."""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=Path(__file__).parent, capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Direct children of `main` are indented by exactly three spaces
+        if name.startswith("   ") and not name.startswith("    ") and cumulative.strip().isdigit():
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the backend.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if the median import time exceeds this")
+    args = parser.parse_args()
+
+    results = [run_probe() for _ in range(args.runs)]
+    times = [r["import_ms"] for r in results]
+    eager = sorted({name for r in results for name in r["eager"]})
+
+    print(f"import main: median {statistics.median(times):.0f} ms, min {min(times):.0f} ms, max {max(times):.0f} ms ({args.runs} runs)")
+    print("slowest direct imports:")
+    for ms, name in slowest_imports():
+        print(f"  {ms:8.1f} ms  {name}")
+
+    failed = False
+    if eager:
+        print(f"FAIL: imported eagerly: {', '.join(eager)}")
+        failed = True
+    if args.max_ms is not None and statistics.median(times) > args.max_ms:
+        print(f"FAIL: median import time above {args.max_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
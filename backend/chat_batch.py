@@ -0,0 +1,64 @@
+import asyncio
+import os
+from graph import run_chat_workflow
+from intent_classifier import intent_classifier
+from request_context import RequestContext, run_with_context
+
+class ChatBatchRunner:
+    """
+    Runs many (thread_id, message) turns for /chat/batch.
+    All intents are classified up front in as few Gemini prompts as possible,
+    then up to `concurrency` threads run at once; turns on the same thread
+    stay in submission order. A failing turn only fails its own item.
+    """
+    def __init__(self, concurrency: int = None, max_items: int = None):
+        self.concurrency = concurrency or int(os.getenv("BATCH_CONCURRENCY", "8"))
+        self.max_items = max_items or int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+
+    async def run(self, items: list, budget: float = None) -> list:
+        """`items` are dicts with thread_id, message and optional idempotency_key; results come back in the same order."""
+        self.batches += 1
+        self.items += len(items)
+        intents = await intent_classifier.classify_batch([item["message"] for item in items])
+
+        by_thread = {}
+        for index, item in enumerate(items):
+            by_thread.setdefault(item["thread_id"], []).append(index)
+
+        results = [None] * len(items)
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def run_thread(indices: list):
+            async with slots:
+                for index in indices:
+                    results[index] = await self._run_item(items[index], intents[index], budget)
+
+        await asyncio.gather(*(run_thread(indices) for indices in by_thread.values()))
+        return results
+
+    async def _run_item(self, item: dict, intent: str, budget: float) -> dict:
+        ctx = RequestContext(budget=budget)
+        ctx.intent_hint = intent
+        try:
+            response = await run_with_context(
+                ctx, run_chat_workflow(item["message"], item["thread_id"], item.get("idempotency_key"))
+            )
+        except Exception as e:
+            self.errors += 1
+            return {"thread_id": item["thread_id"], "response": None, "degraded": ctx.degraded, "error": str(e)}
+        return {"thread_id": item["thread_id"], "response": response, "degraded": ctx.degraded, "error": None}
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+        }
+
+# Singleton instance
+chat_batch = ChatBatchRunner()
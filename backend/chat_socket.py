@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+from graph import run_chat_workflow
+from request_context import RequestContext, run_with_context
+import metrics
+
+# Protocol (JSON text frames) on /ws/{thread_id}:
+#   client -> server  {"type": "message", "id": "<optional>", "message": "..."}
+#                     {"type": "ping"} / {"type": "pong"}
+#   server -> client  {"type": "ack", "id", "position"}   message accepted, `position` turns ahead of it
+#                     {"type": "token", "id", "text"}     streamed output
+#                     {"type": "done", "id", "response", "degraded"[, "trace"]}
+#                     {"type": "error", "id", "detail"}
+#                     {"type": "ping"}                    heartbeat, answer with {"type": "pong"}
+# The message id doubles as the idempotency key, so resending a message after
+# a reconnect returns the original reply instead of running the turn again.
+
+class _TokenSink:
+    """Queue-like RequestContext.token_sink that tags each chunk with its message id."""
+    def __init__(self, connection: "ChatConnection", message_id: str):
+        self.connection = connection
+        self.message_id = message_id
+
+    async def put(self, text: str):
+        await self.connection.push({"type": "token", "id": self.message_id, "text": text})
+
+class ChatConnection:
+    """
+    One client session. Incoming messages wait in a bounded inbox and run one
+    at a time through run_chat_workflow; everything sent back goes through a
+    bounded outbox drained by a single sender, so a slow client slows token
+    delivery (backpressure) and is disconnected once a send stalls.
+    """
+    def __init__(self, hub: "ChatSocketHub", websocket: WebSocket, thread_id: str, budget: float = None,
+                 trace: bool = False):
+        self.hub = hub
+        self.websocket = websocket
+        self.thread_id = thread_id
+        self.budget = budget
+        self.trace = trace
+        self.inbox = asyncio.Queue(maxsize=hub.max_pending)
+        self.outbox = asyncio.Queue(maxsize=hub.send_queue)
+        self.last_seen = time.monotonic()
+        self._turn_ctx = None
+
+    async def push(self, event: dict):
+        await self.outbox.put(event)
+
+    async def serve(self):
+        tasks = [asyncio.create_task(loop()) for loop in (self._receive, self._send, self._process, self._heartbeat)]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._detach()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.websocket.client_state == WebSocketState.CONNECTED:
+                try:
+                    await self.websocket.close()
+                except (WebSocketDisconnect, RuntimeError):
+                    pass  # the client went away first
+
+    def _detach(self):
+        # The turn in flight keeps running so its state is saved; stop streaming
+        # it and unblock any chunk waiting for room in the outbox.
+        if self._turn_ctx:
+            self._turn_ctx.token_sink = None
+        while not self.outbox.empty():
+            self.outbox.get_nowait()
+
+    async def _receive(self):
+        try:
+            while True:
+                raw = await self.websocket.receive_text()
+                self.last_seen = time.monotonic()
+                try:
+                    data = json.loads(raw)
+                except json.JSONDecodeError:
+                    await self.push({"type": "error", "id": None, "detail": "Invalid JSON"})
+                    continue
+                if not isinstance(data, dict):
+                    data = {"message": data}
+
+                kind = data.get("type", "message")
+                if kind == "ping":
+                    await self.push({"type": "pong"})
+                    continue
+                if kind != "message":
+                    continue
+
+                message_id = str(data.get("id") or uuid.uuid4().hex)
+                message = str(data.get("message") or "").strip()
+                if not message:
+                    await self.push({"type": "error", "id": message_id, "detail": "Empty message"})
+                    continue
+                try:
+                    self.inbox.put_nowait((message_id, message))
+                except asyncio.QueueFull:
+                    self.hub.rejected += 1
+                    await self.push({"type": "error", "id": message_id, "detail": "Too many pending messages, retry shortly"})
+                    continue
+                self.hub.messages += 1
+                await self.push({"type": "ack", "id": message_id, "position": self.inbox.qsize() - 1})
+        except WebSocketDisconnect:
+            return
+
+    async def _send(self):
+        while True:
+            event = await self.outbox.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_json(event), timeout=self.hub.send_timeout)
+            except asyncio.TimeoutError:
+                self.hub.slow_consumers += 1
+                return
+            except (WebSocketDisconnect, RuntimeError):
+                return
+
+    async def _process(self):
+        while True:
+            message_id, message = await self.inbox.get()
+            ctx = RequestContext(token_sink=_TokenSink(self, message_id), budget=self.budget)
+            self._turn_ctx = ctx
+            start = time.perf_counter()
+            # Own task (shielded below) so a disconnect does not cancel the turn
+            # before it has saved the thread state
+            turn = asyncio.create_task(
+                run_with_context(ctx, run_chat_workflow(message, self.thread_id, idempotency_key=message_id))
+            )
+            try:
+                response_text = await asyncio.shield(turn)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await self.push({"type": "error", "id": message_id, "detail": str(e)})
+                continue
+            finally:
+                self._turn_ctx = None
+
+            done = {"type": "done", "id": message_id, "response": response_text, "degraded": ctx.degraded}
+            if self.trace:
+                done["trace"] = metrics.format_trace(ctx.trace, time.perf_counter() - start)
+            await self.push(done)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.hub.heartbeat_interval)
+            # Anything from the client (including pongs) counts as a sign of life
+            if time.monotonic() - self.last_seen > self.hub.heartbeat_interval * self.hub.heartbeat_misses:
+                self.hub.timed_out += 1
+                return
+            await self.push({"type": "ping"})
+
+class ChatSocketHub:
+    """Settings and counters shared by all /ws connections."""
+    def __init__(self):
+        self.heartbeat_interval = float(os.getenv("WS_HEARTBEAT_INTERVAL", "20"))
+        self.heartbeat_misses = int(os.getenv("WS_HEARTBEAT_MISSES", "3"))
+        self.max_pending = int(os.getenv("WS_MAX_PENDING", "8"))
+        self.send_queue = int(os.getenv("WS_SEND_QUEUE", "256"))
+        self.send_timeout = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+
+        self.active = 0
+        self.connections = 0
+        self.messages = 0
+        self.rejected = 0
+        self.slow_consumers = 0
+        self.timed_out = 0
+
+    async def serve(self, websocket: WebSocket, thread_id: str, budget: float = None, trace: bool = False):
+        await websocket.accept()
+        self.active += 1
+        self.connections += 1
+        try:
+            await ChatConnection(self, websocket, thread_id, budget, trace).serve()
+        finally:
+            self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "connections": self.connections,
+            "messages": self.messages,
+            "rejected": self.rejected,
+            "slow_consumers": self.slow_consumers,
+            "timed_out": self.timed_out,
+        }
+
+# Singleton instance
+chat_sockets = ChatSocketHub()
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+
+# Cheaper/faster models for small tasks; everything else uses GEMINI_MODEL.
+# Override any of them with GEMINI_MODEL_<METHOD>, e.g. GEMINI_MODEL_GENERATE_STUDY_PLAN.
+DEFAULT_TASK_MODELS = {
+    "detect_intent": "gemini-2.5-flash-lite",
+    "detect_intents_batch": "gemini-2.5-flash-lite",
+    "extract_student_fields": "gemini-2.5-flash-lite",
+}
+
+MODELS_FILE = Path(__file__).parent.parent / "models.txt"
+
+def load_model_catalogue(path: Path = MODELS_FILE) -> set:
+    """Model names from models.txt (as written by list_models.py), without the `models/` prefix."""
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return set()
+    return {line.strip()[len("models/"):] for line in lines if line.strip().startswith("models/")}
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they already are)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        # May go negative when actual usage exceeds the estimate; refill pays it back
+        self._refill()
+        self.tokens -= amount
+
+class KeySlot:
+    """One API key: its own async client, RPM/TPM buckets and 429 cooldown."""
+    def __init__(self, api_key: str, rpm: float, tpm: float):
+        self.api_key = api_key
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.inflight = 0
+        self.cooldown_until = 0.0
+        self._client = None
+        self._models = {}
+
+        self.calls = 0
+        self.rate_limited = 0
+
+    def wait_time(self, est_tokens: float) -> float:
+        cooldown = max(0.0, self.cooldown_until - time.monotonic())
+        return max(cooldown, self.requests.wait_time(1), self.tokens.wait_time(est_tokens))
+
+    def model(self, model_name: str):
+        model = self._models.get(model_name)
+        if model is None:
+            import google.generativeai as genai
+            from google.ai import generativelanguage as glm
+            if self._client is None:
+                # Created lazily so the gRPC channel binds to the running event loop
+                self._client = glm.GenerativeServiceAsyncClient(client_options={"api_key": self.api_key})
+            model = genai.GenerativeModel(model_name)
+            # GenerativeModel otherwise uses the process-wide client from
+            # genai.configure(); give it this key's client instead.
+            model._async_client = self._client
+            self._models[model_name] = model
+        return model
+
+class ClientPool:
+    """
+    Spreads Gemini calls over several API keys.
+    Each call goes to the least-loaded key that has RPM/TPM budget left; a key
+    that returns 429 cools down for GEMINI_KEY_COOLDOWN seconds and the call
+    spills over to the next key. The model is chosen per AIAgent method.
+    """
+    def __init__(self, api_keys: list):
+        rpm = float(os.getenv("GEMINI_KEY_RPM", "60"))
+        tpm = float(os.getenv("GEMINI_KEY_TPM", "1000000"))
+        self.cooldown = float(os.getenv("GEMINI_KEY_COOLDOWN", "20"))
+        self.slots = [KeySlot(key, rpm, tpm) for key in api_keys]
+
+        self.default_model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+        self.catalogue = load_model_catalogue()
+        for name in {self.default_model, *DEFAULT_TASK_MODELS.values()}:
+            if self.catalogue and name not in self.catalogue:
+                print(f"⚠️ WARNING: model '{name}' is not listed in models.txt")
+
+    def model_for(self, method: str) -> str:
+        return os.getenv(f"GEMINI_MODEL_{method.upper()}") or DEFAULT_TASK_MODELS.get(method, self.default_model)
+
+    async def acquire(self, est_tokens: float, exclude: set = ()) -> KeySlot:
+        """Waits for and reserves the least-loaded key with budget for one call of ~est_tokens."""
+        while True:
+            candidates = [slot for slot in self.slots if slot not in exclude] or self.slots
+            waits = [(slot.wait_time(est_tokens), slot.inflight, i) for i, slot in enumerate(candidates)]
+            wait, _, index = min(waits)
+            if wait <= 0:
+                slot = candidates[index]
+                slot.requests.consume(1)
+                slot.tokens.consume(est_tokens)
+                slot.inflight += 1
+                slot.calls += 1
+                return slot
+            await asyncio.sleep(min(wait, 1.0))
+
+    def release(self, slot: KeySlot, est_tokens: float = 0, used_tokens: int = None):
+        slot.inflight -= 1
+        if used_tokens and used_tokens > est_tokens:
+            slot.tokens.consume(used_tokens - est_tokens)
+
+    def report_rate_limited(self, slot: KeySlot):
+        slot.rate_limited += 1
+        slot.cooldown_until = time.monotonic() + self.cooldown
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "keys": len(self.slots),
+            "default_model": self.default_model,
+            "slots": {
+                f"key_{i}": {
+                    "inflight": slot.inflight,
+                    "calls": slot.calls,
+                    "rate_limited": slot.rate_limited,
+                    "cooling_down": slot.cooldown_until > now,
+                }
+                for i, slot in enumerate(self.slots)
+            },
+        }
@@ -0,0 +1,25 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+class KeyedLock:
+    """
+    One asyncio.Lock per key, created on demand and dropped once nobody holds
+    or waits for it, so idle threads cost nothing.
+    """
+    def __init__(self):
+        self._locks = {}  # key -> [lock, holders + waiters]
+
+    def __len__(self):
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, key: str):
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
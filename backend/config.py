@@ -0,0 +1,10 @@
+"""
+Loads backend/.env into os.environ. Imported first by main.py (and by
+ai_agent.py for scripts that skip main), so settings are in place before
+any module reads them and the file is read once per process.
+"""
+from pathlib import Path
+from dotenv import load_dotenv
+
+ENV_PATH = Path(__file__).parent / ".env"
+load_dotenv(dotenv_path=ENV_PATH)
@@ -0,0 +1,115 @@
+import os
+import re
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting English prompts
+    return len(text) // 4 + 1
+
+def _clip(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + " …"
+
+def _gist(message: str, max_chars: int = 160) -> str:
+    """First sentence or line of a message, with Markdown decoration stripped."""
+    text = re.sub(r"[#*_`>]+", "", message)
+    text = " ".join(text.split())
+    match = re.match(r"(.+?[.!?])(\s|$)", text)
+    if match:
+        text = match.group(1)
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + " …"
+
+FACT_LABELS = {
+    "education_level": "education level",
+    "subjects_count": "subjects",
+    "study_hours": "study hours/day",
+    "exam_timeline": "days until exams",
+    "study_habit": "study habit",
+}
+
+class ConversationContext:
+    """
+    Keeps prompt context a fixed size no matter how long a thread runs.
+
+    After each turn, messages beyond the last `keep_recent` are folded into a
+    rolling summary stored on the thread state (`summary`), so each message
+    is summarized once and the result is persisted with the thread. Prompts
+    are then built from: the collected student_data as compact facts, the
+    summary, and as many recent messages as fit in `budget_tokens`.
+    """
+    def __init__(self, budget_tokens: int = None, keep_recent: int = None, summary_tokens: int = None,
+                 message_tokens: int = None):
+        self.budget_tokens = budget_tokens or int(os.getenv("CONTEXT_BUDGET_TOKENS", "1200"))
+        self.keep_recent = keep_recent or int(os.getenv("CONTEXT_KEEP_RECENT", "6"))
+        self.summary_tokens = summary_tokens or int(os.getenv("CONTEXT_SUMMARY_TOKENS", "300"))
+        # A single long reply (e.g. a full plan) may only take this much of the window
+        self.message_tokens = message_tokens or int(os.getenv("CONTEXT_MESSAGE_TOKENS", "250"))
+        self.llm_summary = os.getenv("CONTEXT_LLM_SUMMARY", "0") == "1"
+
+    async def compact(self, state: dict) -> dict:
+        """Folds messages older than the verbatim window into state['summary']."""
+        messages = state.get("messages") or []
+        overflow = len(messages) - self.keep_recent
+        if overflow <= 0:
+            return state
+
+        dropped, state["messages"] = messages[:overflow], messages[overflow:]
+        previous = state.get("summary") or ""
+        summary = None
+        if self.llm_summary:
+            from ai_agent import ai_agent
+            summary = await ai_agent.summarize_conversation(previous, dropped, self.summary_tokens)
+        if not summary:
+            summary = self._local_summary(previous, dropped)
+        state["summary"] = summary
+        return state
+
+    def _local_summary(self, previous: str, dropped: list) -> str:
+        lines = [line for line in previous.split("\n") if line]
+        lines.extend(f"- {_gist(message)}" for message in dropped if message.strip())
+        # Oldest points fall off first once the summary is over budget
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def facts(self, state: dict) -> str:
+        student_data = state.get("student_data") or {}
+        parts = [f"{FACT_LABELS.get(key, key)}: {value}" for key, value in student_data.items() if value not in (None, "")]
+        return "; ".join(parts)
+
+    def recent_messages(self, state: dict, budget_tokens: int = None, exclude_last: bool = True) -> list:
+        """Newest messages (oldest first in the result) that fit in `budget_tokens`."""
+        budget = budget_tokens if budget_tokens is not None else self.budget_tokens
+        messages = list(state.get("messages") or [])
+        if exclude_last and messages:
+            # The current message is passed to the prompt separately
+            messages = messages[:-1]
+        selected = []
+        for message in reversed(messages):
+            clipped = _clip(message, self.message_tokens)
+            cost = estimate_tokens(clipped)
+            if cost > budget:
+                break
+            selected.append(clipped)
+            budget -= cost
+        return list(reversed(selected))
+
+    def build(self, state: dict) -> str:
+        """Prompt context: student facts, earlier-conversation summary and recent messages."""
+        sections = []
+        facts = self.facts(state)
+        if facts:
+            sections.append(f"Known facts about the student: {facts}")
+        summary = state.get("summary")
+        if summary:
+            sections.append(f"Summary of earlier conversation:\n{_clip(summary, self.summary_tokens)}")
+
+        remaining = self.budget_tokens - sum(estimate_tokens(section) for section in sections)
+        recent = self.recent_messages(state, max(0, remaining))
+        if recent:
+            sections.append("Recent messages (oldest first):\n" + "\n".join(f"- {m}" for m in recent))
+        return "\n\n".join(sections)
+
+# Singleton instance
+conversation_context = ConversationContext()
@@ -1,18 +1,27 @@
+import asyncio
 import logging
+import os
+import random
+import time
+from collections import deque
+import metrics
 
 logger = logging.getLogger(__name__)
 
 # Mock DB interaction since no keys were provided
 class SupabaseClient:
-    def __init__(self):
-        self.data = []
+    def __init__(self, max_rows: int = 1000):
+        # Bounded so the mock can stay up as a local stand-in without growing forever
+        self.data = deque(maxlen=max_rows)
 
     def table(self, table_name):
         return self
 
     def insert(self, data):
-        logger.info(f"[MOCK DB] Inserting into DB: {data}")
-        self.data.append(data)
+        rows = data if isinstance(data, list) else [data]
+        logger.info(f"[MOCK DB] Inserting {len(rows)} row(s) into DB")
+        logger.debug(f"[MOCK DB] Rows: {rows}")
+        self.data.extend(rows)
         return self
 
     def execute(self):
@@ -25,3 +34,101 @@ def save_study_plan(student_data: dict, plan: str):
         "student_data": student_data,
         "plan": plan
     }).execute()
+
+class StudyPlanWriter:
+    """
+    Write-behind queue for study plans.
+    Rows are batched into one bulk insert once `batch_size` rows are queued or
+    `flush_interval` seconds have passed since the first one. submit() waits
+    when `max_queue` rows are already waiting (backpressure). Failed batches
+    are retried with jittered exponential backoff.
+    """
+    def __init__(self, client, table: str = "study_plans", batch_size: int = None, flush_interval: float = None,
+                 max_queue: int = None, max_retries: int = None):
+        self.client = client
+        self.table = table
+        self.batch_size = batch_size or int(os.getenv("PLAN_WRITE_BATCH", "50"))
+        self.flush_interval = flush_interval or float(os.getenv("PLAN_WRITE_INTERVAL", "1.0"))
+        self.max_queue = max_queue or int(os.getenv("PLAN_WRITE_MAX_QUEUE", "1000"))
+        self.max_retries = max_retries or int(os.getenv("PLAN_WRITE_RETRIES", "3"))
+
+        self._queue = None
+        self._worker = None
+
+        self.submitted = 0
+        self.from_cache = 0
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.dropped = 0
+
+    async def submit(self, student_data: dict, plan: str, cached: bool = False):
+        """Queues a plan; `cached` marks plans served from plan_cache rather than generated."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = asyncio.create_task(self._run())
+        await self._queue.put({"student_data": student_data, "plan": plan})
+        self.submitted += 1
+        if cached:
+            self.from_cache += 1
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is None:
+                return
+            batch = [row]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._write(batch)
+
+    async def _write(self, batch: list):
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(lambda: self.client.table(self.table).insert(batch).execute())
+                metrics.db_write_duration.observe(time.perf_counter() - start)
+                self.written += len(batch)
+                self.batches += 1
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Dropping {len(batch)} study plan(s) after {attempt + 1} attempts: {e}")
+                    self.dropped += len(batch)
+                    return
+                self.retries += 1
+                await asyncio.sleep(0.5 * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    async def close(self):
+        """Flushes everything queued so far and stops the worker."""
+        if self._worker is None or self._worker.done():
+            return
+        await self._queue.put(None)
+        await self._worker
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "submitted": self.submitted,
+            "from_cache": self.from_cache,
+            "cache_hit_rate": round(self.from_cache / self.submitted, 4) if self.submitted else 0.0,
+            "written": self.written,
+            "batches": self.batches,
+            "retries": self.retries,
+            "dropped": self.dropped,
+        }
+
+plan_writer = StudyPlanWriter(supabase)
@@ -1,7 +1,19 @@
-from langgraph.graph import StateGraph, END
 from typing import TypedDict, Optional, List
 from ai_agent import ai_agent
-from db import save_study_plan
+from db import plan_writer
+from plan_cache import plan_cache
+from intent_classifier import intent_classifier
+from session_store import session_store
+from conversation_context import conversation_context
+from profile_extraction import NUMERIC_FIELDS, extract_fields, missing_fields, next_question, normalize_fields
+from concurrency import KeyedLock
+from cache import ResponseCache
+from request_context import get_request_context
+import metrics
+import hashlib
+import inspect
+import os
+import time
 
 class AgentState(TypedDict):
     messages: List[str]
@@ -9,6 +21,10 @@ class AgentState(TypedDict):
     student_data: dict
     next_question: Optional[str]
     plan_generated: bool
+    # Rolling summary of messages that no longer fit the verbatim window
+    summary: Optional[str]
+    # Reply drafted together with the intent (combined classify mode)
+    pending_response: Optional[str]
 
 # --- NODES ---
 
@@ -19,66 +35,69 @@ def start_node(state: AgentState):
     return state
 
 async def intent_router_node(state: AgentState):
-    # Short-circuit: if we are mid-conversation for data collection, stick to it.
-    if state.get("next_question"):
-        state["intent"] = "study_planning"
+    ctx = get_request_context()
+    if ctx and ctx.intent_hint:
+        state["intent"] = ctx.intent_hint
+        state["pending_response"] = None
         return state
 
     last_message = state["messages"][-1]
-    
-    # AI-based intent classification
-    intent = await ai_agent.detect_intent(last_message)
+
+    # Local keyword classification, falling back to Gemini when unsure.
+    # The fallback may answer the message in the same call.
+    intent, reply = await intent_classifier.classify_with_reply(
+        last_message,
+        previous_messages=conversation_context.recent_messages(state),
+        context=conversation_context.build(state),
+    )
     state["intent"] = intent
+    state["pending_response"] = reply
     return state
 
-def data_collection_node(state: AgentState):
+def take_pending_response(state: AgentState) -> Optional[str]:
+    reply = state.get("pending_response")
+    state["pending_response"] = None
+    return reply
+
+async def data_collection_node(state: AgentState):
+    state["intent"] = "study_planning"
     student_data = state["student_data"]
     last_message = state["messages"][-1]
-    
-    # Existing basic state machine for data collection
-    # (We can enhance this with AI extraction later if needed)
-    last_question = state.get("next_question")
-    
-    if last_question:
-        # Map the previous question to a data field
-        # Simple heuristic mapping
-        lower_q = last_question.lower()
-        if "level" in lower_q:
-            student_data["education_level"] = last_message
-        elif "subjects" in lower_q:
-            student_data["subjects_count"] = last_message
-        elif "hours" in lower_q:
-            student_data["study_hours"] = last_message
-        elif "exam" in lower_q and "days" not in lower_q: 
-            # Ambiguous case, but usually follows order
-            pass 
-        elif "days" in lower_q or "when" in lower_q or "timeline" in lower_q:
-             student_data["exam_timeline"] = last_message
-        elif "habit" in lower_q:
-             student_data["study_habit"] = last_message
-
-    # Determine what is missing
-    required_fields = [
-        ("education_level", "What is your current education level? (e.g., High School, College)"),
-        ("subjects_count", "How many subjects are you focusing on?"),
-        ("study_hours", "How many hours can you dedicate to studying daily?"),
-        ("exam_timeline", "When are your exams starting? (e.g., in 2 weeks, 10 days)"),
-        ("study_habit", "How would you describe your study habits? (e.g., Consistent, Last-minute, Procrastinator)")
-    ]
-    
-    next_q = None
-    for field, question in required_fields:
-        if field not in student_data:
-            next_q = question
-            break
-            
-    state["next_question"] = next_q
+
+    # The pending question is always about the first missing field
+    expected = missing_fields(student_data)[0] if state.get("next_question") else None
+
+    # Pull everything the message states locally ("college, 4 subjects, 3h a day, exams in 2 weeks")
+    found = extract_fields(last_message, expected)
+    student_data.update(found)
+
+    # Gemini only for an answer to our question that the parser could not read at all
+    if expected and not found:
+        found = normalize_fields(await ai_agent.extract_student_fields(last_message, missing_fields(student_data)))
+        student_data.update(found)
+        if expected not in found and expected not in NUMERIC_FIELDS:
+            # Free-text fields take the answer as given
+            student_data[expected] = last_message.strip()
+
+    # Opening ask lists everything still missing; follow-ups go one field at a time
+    state["next_question"] = next_question(student_data, combined=expected is None)
     state["student_data"] = student_data
     return state
 
 async def study_plan_generator_node(state: AgentState):
-    plan = await ai_agent.generate_study_plan(state["student_data"])
-    save_study_plan(state["student_data"], plan)
+    student_data = state["student_data"]
+    ctx = get_request_context()
+    plan = await plan_cache.get(student_data)
+    cached = plan is not None
+    if cached:
+        if ctx:
+            await ctx.emit(plan)
+    else:
+        # template is None for fallback plans (no key, shed, failed), which are not kept
+        plan, template = await ai_agent.generate_study_plan(student_data)
+        if template:
+            await plan_cache.put(student_data, template)
+    await plan_writer.submit(student_data, plan, cached=cached)
     state["plan_generated"] = True
     state["messages"].append(plan) 
     return state
@@ -86,24 +105,33 @@ async def study_plan_generator_node(state: AgentState):
 async def practice_node(state: AgentState):
     last_message = state["messages"][-1]
     # Use the message as the topic
-    response = await ai_agent.generate_practice_questions(last_message)
+    response = take_pending_response(state) or await ai_agent.generate_practice_questions(last_message)
     state["messages"].append(response)
     return state
 
 async def stress_node(state: AgentState):
     last_message = state["messages"][-1]
-    response = await ai_agent.generate_stress_relief_tips(last_message)
+    response = take_pending_response(state) or await ai_agent.generate_stress_relief_tips(last_message)
     state["messages"].append(response)
     return state
 
 async def general_chat_node(state: AgentState):
     last_message = state["messages"][-1]
-    response = await ai_agent.generate_response(last_message, context="User is interacting with the study bot.")
+    response = take_pending_response(state) or await ai_agent.generate_response(
+        last_message,
+        context="User is interacting with the study bot.\n\n" + conversation_context.build(state),
+    )
     state["messages"].append(response)
     return state
 
 # --- EDGES ---
 
+def route_from_start(state: AgentState):
+    # Mid-interview the message is an answer to next_question: no need to classify it
+    if state.get("next_question"):
+        return "collect_data"
+    return "classify_intent"
+
 def check_data_completeness(state: AgentState):
     if state.get("next_question"):
         return "ask_question"
@@ -122,112 +150,95 @@ def route_after_intent(state: AgentState):
 
 # --- GRAPH ---
 
-workflow = StateGraph(AgentState)
-
-workflow.add_node("start", start_node)
-workflow.add_node("classify_intent", intent_router_node)
-workflow.add_node("collect_data", data_collection_node)
-workflow.add_node("generate_plan", study_plan_generator_node)
-workflow.add_node("practice_questions", practice_node)
-workflow.add_node("stress_relief", stress_node)
-workflow.add_node("general_chat", general_chat_node) # New node
-
-workflow.set_entry_point("start")
+# Same value as langgraph.graph.END, without importing langgraph
+END = "__end__"
 
-workflow.add_edge("start", "classify_intent")
+NODES = {
+    "start": start_node,
+    "classify_intent": intent_router_node,
+    "collect_data": data_collection_node,
+    "generate_plan": study_plan_generator_node,
+    "practice_questions": practice_node,
+    "stress_relief": stress_node,
+    "general_chat": general_chat_node,
+}
+NODES = {name: metrics.instrument_node(name, fn) for name, fn in NODES.items()}
 
-workflow.add_conditional_edges(
-    "classify_intent",
-    route_after_intent,
-    {
+# node -> (router, router result -> next node); nodes not listed here end the turn
+BRANCHES = {
+    "start": (route_from_start, {
+        "collect_data": "collect_data",
+        "classify_intent": "classify_intent",
+    }),
+    "classify_intent": (route_after_intent, {
         "collect_data": "collect_data",
         "practice_questions": "practice_questions",
         "stress_relief": "stress_relief",
-        "general_chat": "general_chat"
-    }
-)
+        "general_chat": "general_chat",
+    }),
+    "collect_data": (check_data_completeness, {
+        "ask_question": END,
+        "generate_plan": "generate_plan",
+    }),
+}
 
-workflow.add_conditional_edges(
-    "collect_data",
-    check_data_completeness,
-    {
-        "ask_question": END, 
-        "generate_plan": "generate_plan"
-    }
-)
+RECURSION_LIMIT = 10
 
-workflow.add_edge("generate_plan", END)
-workflow.add_edge("practice_questions", END)
-workflow.add_edge("stress_relief", END)
-workflow.add_edge("general_chat", END)
+_app_graph = None
 
-app_graph = workflow.compile()
+def get_app_graph():
+    """The compiled LangGraph graph, built on first use (langgraph is slow to import)."""
+    global _app_graph
+    if _app_graph is None:
+        from langgraph.graph import StateGraph
 
-async def run_chat_workflow(message: str, thread_id: str):
-    # In-memory state storage (demo only)
-    if not hasattr(run_chat_workflow, "state_store"):
-        run_chat_workflow.state_store = {}
-    
-    current_state = run_chat_workflow.state_store.get(thread_id, {
-        "messages": [],
-        "intent": None,
-        "student_data": {},
-        "next_question": None,
-        "plan_generated": False
-    })
-    
+        workflow = StateGraph(AgentState)
+        for name, node in NODES.items():
+            workflow.add_node(name, node)
+        workflow.set_entry_point("start")
+        for name, (router, path_map) in BRANCHES.items():
+            workflow.add_conditional_edges(name, router, path_map)
+        for name in NODES:
+            if name not in BRANCHES:
+                workflow.add_edge(name, END)
+        _app_graph = workflow.compile()
+    return _app_graph
+
+async def run_direct(state: AgentState) -> AgentState:
+    """
+    Walks the same NODES/BRANCHES as the LangGraph graph with plain function calls.
+    Every path here is a short chain of nodes that mutate and return the
+    whole state, so LangGraph's per-step channel bookkeeping and state
+    copies buy nothing; bench_dispatch.py measures the difference.
+    """
+    node = "start"
+    for _ in range(RECURSION_LIMIT):
+        result = NODES[node](state)
+        state = await result if inspect.isawaitable(result) else result
+        if node not in BRANCHES:
+            return state
+        router, path_map = BRANCHES[node]
+        node = path_map[router(state)]
+        if node == END:
+            return state
+    raise RuntimeError(f"Graph did not finish within {RECURSION_LIMIT} steps")
+
+# Set FAST_DISPATCH=0 to run turns through LangGraph instead
+fast_dispatch = os.getenv("FAST_DISPATCH", "1") == "1"
+
+async def _run_turn(message: str, thread_id: str):
+    current_state = await session_store.load(thread_id)
     current_state["messages"].append(message)
+
+    if fast_dispatch:
+        result = await run_direct(current_state)
+    else:
+        result = await get_app_graph().ainvoke(current_state, {"recursion_limit": RECURSION_LIMIT})
+    # Fold old messages into the thread summary before reading the reply
+    # (compaction never drops the newest messages)
+    result = await conversation_context.compact(result)
     
-    # We always start from 'start' in this stateless REST wrapper usage, 
-    # effectively reloading the 'persisted' state into the graph run.
-    # Note: real LangGraph with Checkpointer handles this better.
-    
-    # If we are in the middle of data collection
-    # (next_question was set in previous turn), we might want to ensure we go back to collect_data?
-    # Actually, the 'classify_intent' node will run again.
-    # If the user answers "High School", 'detect_intent' might say "general_chat" or "study_planning".
-    # If it says "general_chat", we break the flow.
-    # FIX: We should check if we are in data collection mode and skip intent detection?
-    
-    # Simple fix for demo: If next_question is set, force intent to study_planning
-    if current_state.get("next_question"):
-        current_state["intent"] = "study_planning" # Force it back to collection flow
-        # But we can't easily jump to a node in this simple setup without using the graph's memory features fully.
-        # However, our 'classify_intent' uses the *last message* to detect intent.
-        # If I answer "3 hours", AI might thinks it's 'general'.
-        
-        # Override intent detection logic: if we have pending questions, assume we are answering them.
-        pass # We'll handle this by letting the graph run, but maybe we should inject context or bypass?
-        
-    # To properly support the flow "User answers question -> Graph processes answer", 
-    # we can modify 'intent_router_node' to check state logic too, handled below in 'input_config' or just rely on state.
-
-    # Let's trust the graph edges. 
-    # But wait! If we start at 'start' -> 'classify_intent', the AI sees "3 hours". 
-    # It might classify as 'general_chat' -> 'general_chat_node'. The flow breaks.
-    
-    # WORKAROUND: In run_chat_workflow, if we expect an answer, we can pre-set the intent?
-    # Or better: Update 'intent_router_node' to respect existing unfinished business? -> Modified intent_router_node above?
-    # No, I can't access 'state' easily outside the node function inside the node definition.
-    # But I can modify the state PASSED IN.
-    
-    if current_state.get("next_question"):
-        # We are expecting an answer.
-        # We can bypass classification?
-        # LangGraph entry point is 'start'.
-        # We can add a conditional edge from 'start' to 'collect_data' if student_data incomplete?
-        # That would be a better graph design.
-        pass 
-
-    # For now, let's keep it simple. If we are collecting data, we loop back to collect_data logic.
-    # But the GRAPH defines the flow.
-    # If I add logic to 'intent_router_node' to check `state.get("next_question")`?
-    # YES. I will update intent_router_node in the replacement content to handle this.
-    
-    input_config = {"recursion_limit": 10}
-    result = await app_graph.ainvoke(current_state, input_config)
-    
-    run_chat_workflow.state_store[thread_id] = result
+    await session_store.save(thread_id, result)
     
     if result.get("plan_generated"):
          return result["messages"][-1]
@@ -235,3 +246,38 @@ async def run_chat_workflow(message: str, thread_id: str):
          return result["next_question"]
     else:
          return result["messages"][-1]
+
+# Turns on the same thread run one at a time, so each one sees the state the
+# previous turn saved instead of racing it.
+thread_locks = KeyedLock()
+
+# Replies by (thread_id, idempotency key, message hash). A retried submit joins
+# the in-flight turn or gets its stored reply instead of running the graph
+# again; a reused key with a different message is a new turn.
+idempotent_replies = ResponseCache(
+    "idempotency",
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000")),
+    ttl=float(os.getenv("IDEMPOTENCY_TTL", "600")),
+)
+
+async def _run_turn_locked(message: str, thread_id: str):
+    async with thread_locks.hold(thread_id):
+        ctx = get_request_context()
+        trace_start = len(ctx.trace) if ctx else 0
+        start = time.perf_counter()
+        try:
+            return await _run_turn(message, thread_id)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.turn_duration.observe(elapsed)
+            if ctx:
+                in_nodes = sum(seconds for _, seconds in ctx.trace[trace_start:])
+                metrics.graph_overhead.observe(max(0.0, elapsed - in_nodes))
+
+async def run_chat_workflow(message: str, thread_id: str, idempotency_key: str = None):
+    if idempotency_key:
+        return await idempotent_replies.get_or_compute(
+            f"{thread_id}:{idempotency_key}:{hashlib.sha1(message.encode()).hexdigest()}",
+            lambda: _run_turn_locked(message, thread_id),
+        )
+    return await _run_turn_locked(message, thread_id)
@@ -0,0 +1,98 @@
+import asyncio
+import os
+from ai_agent import ai_agent
+from logic import classify_intent_local
+
+class IntentClassifier:
+    """
+    Two-tier intent detection: the local keyword scorer in logic.py answers
+    when it is confident, and Gemini (AIAgent.detect_intent) is only asked
+    about the rest.
+    """
+    def __init__(self, threshold: float = None):
+        if threshold is None:
+            threshold = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.6"))
+        self.threshold = threshold
+        # Low-confidence messages get intent and reply from one Gemini call
+        self.combined = os.getenv("COMBINED_CLASSIFY", "1") == "1"
+        # Messages per Gemini prompt in classify_batch()
+        self.batch_size = int(os.getenv("INTENT_BATCH_SIZE", "50"))
+        self.local_hits = 0
+        self.llm_fallbacks = 0
+        self.combined_calls = 0
+        self.batched = 0
+        self.batch_calls = 0
+
+    def classify_local(self, message: str) -> tuple:
+        return classify_intent_local(message)
+
+    async def classify(self, message: str) -> str:
+        intent, confidence = self.classify_local(message)
+        if confidence >= self.threshold:
+            self.local_hits += 1
+            return intent
+
+        self.llm_fallbacks += 1
+        return await ai_agent.detect_intent(message)
+
+    async def classify_with_reply(self, message: str, previous_messages: list = None, context: str = "") -> tuple:
+        """
+        Like classify(), but returns (intent, reply). When the local tier is
+        unsure and combined mode is on, the reply comes from the same Gemini
+        call as the intent (streamed, when the request streams) and the graph
+        can skip its second round-trip.
+        reply is None whenever the answering node still has to generate it.
+        """
+        intent, confidence = self.classify_local(message)
+        if confidence >= self.threshold:
+            self.local_hits += 1
+            return intent, None
+
+        if not self.combined:
+            self.llm_fallbacks += 1
+            return await ai_agent.detect_intent(message, previous_messages), None
+
+        self.combined_calls += 1
+        return await ai_agent.classify_and_respond(message, context)
+
+    async def classify_batch(self, messages: list) -> list:
+        """
+        Intents for many messages at once: local where confident, the rest in
+        prompts of up to `batch_size` messages each, sent concurrently.
+        """
+        intents = []
+        unsure = []
+        for i, message in enumerate(messages):
+            intent, confidence = self.classify_local(message)
+            intents.append(intent)
+            if confidence >= self.threshold:
+                self.local_hits += 1
+            else:
+                unsure.append(i)
+
+        chunks = [unsure[i:i + self.batch_size] for i in range(0, len(unsure), self.batch_size)]
+        results = await asyncio.gather(*(ai_agent.detect_intents_batch([messages[i] for i in chunk]) for chunk in chunks))
+        for chunk, chunk_intents in zip(chunks, results):
+            for i, intent in zip(chunk, chunk_intents):
+                intents[i] = intent
+        self.batched += len(unsure)
+        self.batch_calls += len(chunks)
+        return intents
+
+    def stats(self) -> dict:
+        total = self.local_hits + self.llm_fallbacks + self.combined_calls + self.batched
+        return {
+            "threshold": self.threshold,
+            "combined": self.combined,
+            "total": total,
+            "local_hits": self.local_hits,
+            "llm_fallbacks": self.llm_fallbacks,
+            "combined_calls": self.combined_calls,
+            "batched": self.batched,
+            "batch_calls": self.batch_calls,
+            # How many detect_intent calls the local tier avoids per 1k messages
+            "llm_calls_saved_per_1k": round(1000 * self.local_hits / total, 1) if total else 0.0,
+        }
+
+# Singleton instance
+intent_classifier = IntentClassifier()
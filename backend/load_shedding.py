@@ -0,0 +1,76 @@
+import os
+import time
+from collections import deque
+
+class LoadShedder:
+    """
+    Tracks upstream (Gemini) latency and error rate over the last `window`
+    calls and decides when to stop sending traffic upstream.
+
+    Calls are shed when:
+    - more than `max_inflight` LLM calls are already running (admission control),
+    - the windowed mean latency exceeds `latency_threshold` seconds, or
+    - the windowed error rate exceeds `error_rate_threshold`.
+    Once tripped, shedding lasts `cooldown` seconds, after which the window is
+    reset and traffic is let through again.
+    """
+    def __init__(self, latency_threshold: float = None, error_rate_threshold: float = None, deadline: float = None,
+                 max_inflight: int = None, window: int = None, min_samples: int = None, cooldown: float = None):
+        self.latency_threshold = latency_threshold or float(os.getenv("DEGRADE_LATENCY_THRESHOLD", "8"))
+        self.error_rate_threshold = error_rate_threshold or float(os.getenv("DEGRADE_ERROR_RATE", "0.5"))
+        self.deadline = deadline or float(os.getenv("DEGRADE_DEADLINE", "20"))
+        self.max_inflight = max_inflight or int(os.getenv("DEGRADE_MAX_INFLIGHT", "64"))
+        self.window = window or int(os.getenv("DEGRADE_WINDOW", "50"))
+        self.min_samples = min_samples or int(os.getenv("DEGRADE_MIN_SAMPLES", "10"))
+        self.cooldown = cooldown or float(os.getenv("DEGRADE_COOLDOWN", "10"))
+
+        self._samples = deque(maxlen=self.window)  # (latency, ok)
+        self._shed_until = 0.0
+        self.inflight = 0
+
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.timeouts = 0
+        self.degraded = 0
+
+    def should_shed(self) -> bool:
+        now = time.monotonic()
+        if now < self._shed_until:
+            return True
+        if self._shed_until:
+            # Cooldown over: forget the samples that tripped us and try again
+            self._shed_until = 0.0
+            self._samples.clear()
+        if self.inflight >= self.max_inflight:
+            return True
+        if len(self._samples) >= self.min_samples and self._unhealthy():
+            self._shed_until = now + self.cooldown
+            return True
+        return False
+
+    def _unhealthy(self) -> bool:
+        latencies = [latency for latency, _ in self._samples]
+        errors = sum(1 for _, ok in self._samples if not ok)
+        mean_latency = sum(latencies) / len(latencies)
+        return mean_latency > self.latency_threshold or errors / len(self._samples) > self.error_rate_threshold
+
+    def record(self, latency: float, ok: bool, timed_out: bool = False):
+        self._samples.append((latency, ok))
+        self.upstream_calls += 1
+        if not ok:
+            self.upstream_errors += 1
+        if timed_out:
+            self.timeouts += 1
+
+    def stats(self) -> dict:
+        samples = list(self._samples)
+        return {
+            "shedding": time.monotonic() < self._shed_until,
+            "inflight": self.inflight,
+            "window_mean_latency": round(sum(l for l, _ in samples) / len(samples), 3) if samples else 0.0,
+            "window_error_rate": round(sum(1 for _, ok in samples if not ok) / len(samples), 3) if samples else 0.0,
+            "upstream_calls": self.upstream_calls,
+            "upstream_errors": self.upstream_errors,
+            "timeouts": self.timeouts,
+            "degraded_responses": self.degraded,
+        }
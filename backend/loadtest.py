@@ -0,0 +1,384 @@
+"""
+Offline load test for the chat API.
+
+Replaces AIAgent.model with FakeGenerativeModel (configurable latency, error
+rate and output size), then drives the FastAPI app in-process with many
+concurrent simulated users running study-plan interviews, practice and stress
+flows. No network or API quota is used, so it can run in CI.
+
+    python loadtest.py --users 50 --duration 20 --latency-ms 600 --error-rate 0.02
+    python loadtest.py --json --max-p95-ms 2500   # non-zero exit on regression
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeStream:
+    def __init__(self, text: str, chunks: int, delay: float):
+        self._text = text
+        self._chunks = max(1, chunks)
+        self._delay = delay
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        size = max(1, len(self._text) // self._chunks)
+        for i in range(0, len(self._text), size):
+            await asyncio.sleep(self._delay)
+            yield FakeResponse(self._text[i:i + size])
+
+class FakeUpstreamError(Exception):
+    # Mirrors google.api_core's HTTP-coded exceptions
+    def __init__(self, code: int = 503, message: str = "fake upstream unavailable"):
+        super().__init__(message)
+        self.code = code
+
+class FakeGenerativeModel:
+    """
+    Stand-in for genai.GenerativeModel. Latency is log-normal around
+    `latency_ms` (spread set by `latency_sigma`), a fraction `error_rate` of
+    calls raise FakeUpstreamError, and replies are `output_chars` long.
+    """
+    def __init__(self, latency_ms: float = 500, latency_sigma: float = 0.5, error_rate: float = 0.0,
+                 output_chars: int = 1500, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.output_chars = output_chars
+        self.model_name = "models/fake"
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    def _latency(self) -> float:
+        return self.latency_ms / 1000 * self.rng.lognormvariate(0, self.latency_sigma)
+
+    def _reply(self, prompt: str) -> str:
+        if '{"intents"' in prompt:
+            count = len(re.findall(r"^\s*\d+\. ", prompt, flags=re.M))
+            return json.dumps({"intents": [self.rng.choice(["general_chat", "practice_questions", "stress_relief"]) for _ in range(count)]})
+        if '{"questions"' in prompt:
+            questions = [{"question": f"Fake question {self.rng.randint(0, 10**6)}?", "answer": "42"} for _ in range(5)]
+            return json.dumps({"questions": questions})
+        if "motivational study plan" in prompt:
+            return self._plan()
+        if "intent name alone on the first line" in prompt:
+            return "general_chat\n" + self._filler()
+        if "Respond with JSON" in prompt:
+            return "{}"
+        if "classify the intent" in prompt:
+            return self.rng.choice(["general_chat", "practice_questions", "stress_relief"])
+        return self._filler()
+
+    def _plan(self) -> str:
+        """A plan template shaped like Gemini's: placeholders, a session schedule in minutes."""
+        lines = [
+            "## 🚀 Your {education_level} Study Plan",
+            "",
+            "You have **{exam_timeline} days** and **{study_hours} hours a day** for your {subjects_count} subjects.",
+            "",
+            "### 🗓️ Daily Schedule",
+            "",
+            "- **Session 1** (50 minutes): hardest subject first",
+            "- **Break** (10 min): walk, water, no phone",
+            "- **Session 2** (50 minutes): practice questions",
+            "- **Break** (5 min)",
+            "- **Session 3** (25 min): review and flashcards",
+            "",
+        ]
+        # Now and then Gemini ignores the rules and works out a count from the timeline
+        if self.rng.random() < 0.2:
+            lines += ["### 📅 Week 1", "", "Cover every topic once in the first 2 weeks.", ""]
+        plan = "\n".join(lines)
+        return plan + self._filler()[:max(0, self.output_chars - len(plan))]
+
+    def _filler(self) -> str:
+        line = "- **Study tip**: keep sessions short and review often.\n"
+        return (line * (self.output_chars // len(line) + 1))[:self.output_chars]
+
+    async def generate_content_async(self, contents, *, generation_config=None, stream=False, **kwargs):
+        self.calls += 1
+        latency = self._latency()
+        if self.rng.random() < self.error_rate:
+            self.errors += 1
+            await asyncio.sleep(latency / 4)
+            raise FakeUpstreamError(self.rng.choice([429, 503]))
+
+        prompt = contents if isinstance(contents, str) else json.dumps(contents, default=str)
+        text = self._reply(prompt)
+        if stream:
+            # First chunk after ~1/3 of the latency, the rest spread over the remainder
+            await asyncio.sleep(latency / 3)
+            return FakeStream(text, chunks=10, delay=latency * 2 / 30)
+        await asyncio.sleep(latency)
+        return FakeResponse(text)
+
+# --- in-process ASGI client ---
+
+async def asgi_post(app, path: str, payload: dict):
+    body = json.dumps(payload).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("loadtest", 80),
+    }
+    request_sent = False
+    response_done = asyncio.Event()
+    status = None
+    chunks = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                response_done.set()
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+# --- simulated users ---
+
+TOPICS = ["photosynthesis", "calculus", "world history", "organic chemistry", "thermodynamics", "biology"]
+
+def interview_flow(rng):
+    if rng.random() < 0.5:
+        # Everything up front: the profile is extracted in one turn
+        return [
+            f"Can you make me a study plan? {rng.choice(['High school', 'College', 'University'])}, "
+            f"{rng.randint(2, 7)} subjects, {rng.choice([2, 3, 4, 5])}h a day, "
+            f"exams in {rng.choice([1, 2, 4, 8])} weeks, {rng.choice(['consistent', 'last-minute', 'procrastinator'])}",
+        ]
+    return [
+        "Can you make me a study plan?",
+        rng.choice(["High School", "College", "University"]),
+        str(rng.randint(2, 7)),
+        str(rng.choice([2, 3, 4, 5])),
+        str(rng.choice([7, 14, 30, 60])),
+        rng.choice(["Consistent", "Last-minute", "Procrastinator"]),
+    ]
+
+def practice_flow(rng):
+    return [f"Quiz me on {rng.choice(TOPICS)}", f"Give me practice questions on {rng.choice(TOPICS)}"]
+
+def stress_flow(rng):
+    return ["I'm so stressed about my exams", "I feel overwhelmed and anxious"]
+
+def general_flow(rng):
+    return ["hello", f"Explain {rng.choice(TOPICS)} simply", "thanks"]
+
+FLOWS = [(interview_flow, 0.3), (practice_flow, 0.3), (stress_flow, 0.2), (general_flow, 0.2)]
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}  # flow name -> [seconds]
+        self.errors = 0
+        self.degraded = 0
+        self.requests = 0
+
+    def add(self, flow: str, latency: float, ok: bool, degraded: bool):
+        self.latencies.setdefault(flow, []).append(latency)
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+        if degraded:
+            self.degraded += 1
+
+    def all_latencies(self):
+        return [l for values in self.latencies.values() for l in values]
+
+async def simulated_user(app, user_id: int, deadline: float, recorder: Recorder, rng: random.Random, think_ms: float):
+    session = 0
+    while time.monotonic() < deadline:
+        flow = rng.choices([f for f, _ in FLOWS], weights=[w for _, w in FLOWS])[0]
+        thread_id = f"loadtest-{user_id}-{session}"
+        session += 1
+        for message in flow(rng):
+            if time.monotonic() >= deadline:
+                return
+            start = time.perf_counter()
+            status, body = await asgi_post(app, "/chat", {"message": message, "thread_id": thread_id})
+            latency = time.perf_counter() - start
+            degraded = False
+            if status == 200:
+                degraded = json.loads(body).get("degraded", False)
+            recorder.add(flow.__name__, latency, status == 200, degraded)
+            if think_ms:
+                await asyncio.sleep(rng.uniform(0, think_ms) / 1000)
+
+async def monitor_loop_lag(stop: asyncio.Event, samples: list, interval: float = 0.01):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval))
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    # ru_maxrss is KiB on Linux (peak, not current, but close enough elsewhere)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(values: list) -> dict:
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1) if values else 0.0,
+    }
+
+async def run_load_test(args) -> dict:
+    from ai_agent import ai_agent
+    fake = FakeGenerativeModel(args.latency_ms, args.latency_sigma, args.error_rate, args.output_chars, args.seed)
+    ai_agent.model = fake
+    # Backfilled questions go to a scratch bank, not the real one
+    from question_bank import question_bank
+    question_bank.path = Path(tempfile.mkdtemp(prefix="loadtest-bank-"))
+    from plan_cache import plan_cache
+    plan_cache.path = str(Path(tempfile.mkdtemp(prefix="loadtest-plans-")) / "plan_cache.db")
+
+    import main
+    from session_store import session_store
+    from db import plan_writer
+
+    rss_start = rss_bytes()
+    lag_samples = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(monitor_loop_lag(stop, lag_samples))
+
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        simulated_user(main.app, i, deadline, recorder, random.Random(args.seed * 1000 + i), args.think_ms)
+        for i in range(args.users)
+    ])
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await lag_task
+    await session_store.close()
+    await plan_writer.close()
+
+    return {
+        "config": vars(args),
+        "requests": recorder.requests,
+        "errors": recorder.errors,
+        "degraded": recorder.degraded,
+        "elapsed_s": round(elapsed, 2),
+        "requests_per_s": round(recorder.requests / elapsed, 1) if elapsed else 0.0,
+        "latency": summarize(recorder.all_latencies()),
+        "latency_by_flow": {flow: summarize(values) for flow, values in sorted(recorder.latencies.items())},
+        "event_loop_lag": {
+            "p99_ms": round(percentile(lag_samples, 99) * 1000, 2),
+            "max_ms": round(max(lag_samples) * 1000, 2) if lag_samples else 0.0,
+        },
+        "rss_mb": {
+            "start": round(rss_start / 2 ** 20, 1),
+            "end": round(rss_bytes() / 2 ** 20, 1),
+            "growth": round((rss_bytes() - rss_start) / 2 ** 20, 1),
+        },
+        "upstream": {"calls": fake.calls, "errors": fake.errors},
+        "plan_cache": plan_cache.stats(),
+    }
+
+def print_report(report: dict):
+    print(f"requests: {report['requests']}  errors: {report['errors']}  degraded: {report['degraded']}  "
+          f"elapsed: {report['elapsed_s']}s  throughput: {report['requests_per_s']} req/s")
+    print(f"upstream calls: {report['upstream']['calls']}  upstream errors: {report['upstream']['errors']}")
+    print(f"plan cache: {report['plan_cache']['hits']} hits, {report['plan_cache']['misses']} misses "
+          f"(hit rate {report['plan_cache']['hit_rate']}), {report['plan_cache']['not_reusable']} not reusable")
+    print(f"{'flow':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    rows = list(report["latency_by_flow"].items()) + [("all", report["latency"])]
+    for flow, s in rows:
+        print(f"{flow:<16}{s['count']:>8}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}")
+    lag = report["event_loop_lag"]
+    rss = report["rss_mb"]
+    print(f"event loop lag: p99 {lag['p99_ms']} ms, max {lag['max_ms']} ms")
+    print(f"RSS: {rss['start']} MB -> {rss['end']} MB (+{rss['growth']} MB)")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test for the StudyBot chat API.")
+    parser.add_argument("--users", type=int, default=50, help="concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=15, help="test length in seconds")
+    parser.add_argument("--think-ms", type=float, default=50, help="max random pause between a user's messages")
+    parser.add_argument("--latency-ms", type=float, default=500, help="median fake Gemini latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal spread of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake Gemini calls that fail")
+    parser.add_argument("--output-chars", type=int, default=1500, help="size of each fake reply")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="exit non-zero if overall p95 exceeds this")
+    parser.add_argument("--max-errors", type=int, default=None, help="exit non-zero if more requests fail")
+    return parser.parse_args(argv)
+
+def main_cli(argv=None) -> int:
+    args = parse_args(argv)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    report = asyncio.run(run_load_test(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    if args.max_p95_ms is not None and report["latency"]["p95_ms"] > args.max_p95_ms:
+        print(f"FAIL: p95 {report['latency']['p95_ms']} ms > {args.max_p95_ms} ms", file=sys.stderr)
+        return 1
+    if args.max_errors is not None and report["errors"] > args.max_errors:
+        print(f"FAIL: {report['errors']} errors > {args.max_errors}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -1,3 +1,5 @@
+import re
+
 
 def determine_intent_keyword(message: str) -> str:
     message = message.lower()
@@ -13,9 +15,53 @@ def determine_intent_keyword(message: str) -> str:
         return "stress_relief"
     return "study_planning" # Default
 
+# Weighted phrases for the local intent scorer. Multi-word phrases carry more
+# weight than single words since they are much less ambiguous.
+INTENT_KEYWORDS = {
+    "study_planning": {
+        "study plan": 4, "revision plan": 4, "timetable": 3, "schedule": 3, "how to study": 3,
+        "how should i study": 3, "plan": 2, "routine": 2, "organize": 1, "organise": 1, "prepare for": 1,
+    },
+    "practice_questions": {
+        "quiz me": 4, "test me": 4, "practice questions": 4, "practice question": 4, "quiz": 3,
+        "mcq": 3, "mcqs": 3, "questions": 2, "question": 2, "flashcards": 2, "practice": 2, "problems": 1,
+    },
+    "stress_relief": {
+        "stress": 3, "stressed": 3, "anxious": 3, "anxiety": 3, "overwhelmed": 3, "panic": 3, "burnout": 3,
+        "burnt out": 3, "nervous": 2, "worried": 2, "worry": 2, "scared": 2, "motivation": 2,
+        "motivate": 2, "give up": 2, "can't focus": 2, "tired": 1,
+    },
+    "general_chat": {
+        "hi": 3, "hello": 3, "hey": 3, "thanks": 3, "thank you": 3, "bye": 3, "good morning": 3,
+        "good night": 3, "who are you": 3, "what can you do": 3, "ok": 2, "okay": 2, "cool": 2, "great": 1,
+    },
+}
+
+_INTENT_PATTERNS = {
+    intent: [(re.compile(r"\b" + re.escape(phrase) + r"\b"), weight) for phrase, weight in phrases.items()]
+    for intent, phrases in INTENT_KEYWORDS.items()
+}
+
+def classify_intent_local(message: str) -> tuple:
+    """
+    Scores the message against INTENT_KEYWORDS.
+    Returns (intent, confidence), where confidence is the winning intent's
+    share of the total score (smoothed, so a single weak hit stays low).
+    Messages with no keyword hits come back as ("general_chat", 0.0).
+    """
+    text = message.lower().replace("\u2019", "'")
+    scores = {
+        intent: sum(weight for pattern, weight in patterns if pattern.search(text))
+        for intent, patterns in _INTENT_PATTERNS.items()
+    }
+    best = max(scores, key=scores.get)
+    total = sum(scores.values())
+    if total == 0:
+        return "general_chat", 0.0
+    return best, scores[best] / (total + 1.0)
+
 def generate_practice_questions(subject: str = "biology") -> str:
-    # Simulating specific knowledge for the demo
-    # In a real app, this would query a vector DB or LLM
+    # Last resort when the question bank has nothing and Gemini is unavailable
     
     if "biology" in subject.lower():
         return (
@@ -1,10 +1,65 @@
-from fastapi import FastAPI, HTTPException
+import config  # noqa: F401  (loads .env before anything reads settings)
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
+from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
-from graph import run_chat_workflow
+from graph import run_chat_workflow, idempotent_replies
+import graph
+from intent_classifier import intent_classifier
+from ai_agent import ai_agent
+from session_store import session_store
+from db import plan_writer
+from plan_cache import plan_cache
+from question_bank import question_bank
+from chat_socket import chat_sockets
+from chat_batch import chat_batch
+from request_context import RequestContext, run_with_context
+import metrics
+import asyncio
+import json
 import os
+import time
 
-app = FastAPI(title="Study Guidance Bot")
+# WARMUP=1 loads the Gemini SDK and question bank (and compiles the LangGraph
+# graph when FAST_DISPATCH=0) in the background right after startup, so the
+# first requests don't pay for it. WARMUP_LLM=1 also sends one tiny Gemini request.
+WARMUP = os.getenv("WARMUP", "1") == "1"
+WARMUP_LLM = os.getenv("WARMUP_LLM", "0") == "1"
+
+startup = {"ready": not WARMUP, "warmup_seconds": None, "warmup_error": None}
+
+def _warm_up_blocking():
+    ai_agent.model
+    question_bank.load()
+    if not graph.fast_dispatch:
+        graph.get_app_graph()
+
+async def warm_up():
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(_warm_up_blocking)
+        if WARMUP_LLM:
+            await ai_agent.warm_up()
+    except Exception as e:
+        # Still ready: anything that failed to warm up loads lazily or degrades
+        startup["warmup_error"] = str(e)
+    finally:
+        startup["warmup_seconds"] = round(time.perf_counter() - start, 3)
+        startup["ready"] = True
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup_task = asyncio.create_task(warm_up()) if WARMUP else None
+    yield
+    if warmup_task:
+        warmup_task.cancel()
+    # Write out any thread states and study plans still buffered
+    await session_store.close()
+    await plan_writer.close()
+
+app = FastAPI(title="Study Guidance Bot", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,27 +67,162 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Seconds a single chat request may spend waiting on Gemini in total
+REQUEST_BUDGET = float(os.getenv("REQUEST_BUDGET", "25"))
+
 class ChatInput(BaseModel):
     message: str
     thread_id: str = "default_thread"
+    # Clients resend the same key when retrying a message; the retry then
+    # returns the original turn's reply instead of running it again.
+    idempotency_key: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
+    # True when Gemini was skipped or failed and the reply came from the local fallback generators
+    degraded: bool = False
+
+class ChatBatchInput(BaseModel):
+    items: List[ChatInput]
+
+class ChatBatchResult(BaseModel):
+    thread_id: str
+    response: Optional[str] = None
+    degraded: bool = False
+    # Set instead of `response` when this item failed; other items are unaffected
+    error: Optional[str] = None
+
+class ChatBatchResponse(BaseModel):
+    results: List[ChatBatchResult]
 
 @app.get("/")
 def read_root():
     return {"status": "ok", "message": "Study Guidance Bot API is running"}
 
+@app.get("/ready")
+def ready(response: Response):
+    """Readiness probe: 503 until the startup warm-up is done. `/` only tells that the process is alive."""
+    if not startup["ready"]:
+        response.status_code = 503
+        return {"status": "starting"}
+    return {"status": "ready", **startup}
+
+def collect_stats() -> dict:
+    return {
+        "intent_classifier": intent_classifier.stats(),
+        "sessions": session_store.stats(),
+        "study_plan_writes": plan_writer.stats(),
+        "plan_cache": plan_cache.stats(),
+        "idempotency": idempotent_replies.stats(),
+        "upstream": ai_agent.shedder.stats(),
+        "resilience": ai_agent.resilience.stats(),
+        "client_pool": ai_agent.pool.stats() if ai_agent.pool else {"keys": 0},
+        "question_bank": question_bank.stats(),
+        "websockets": chat_sockets.stats(),
+        "batch": chat_batch.stats(),
+        "response_cache": {
+            "practice_questions": ai_agent.practice_cache.stats(),
+            "stress_relief": ai_agent.stress_cache.stats(),
+        },
+    }
+
+@app.get("/stats")
+def stats():
+    return collect_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Prometheus text exposition of node/LLM timings plus every numeric value from /stats."""
+    return PlainTextResponse(
+        metrics.registry.render() + metrics.render_stats(collect_stats()),
+        media_type="text/plain; version=0.0.4",
+    )
+
+def _wants_trace(request: Request) -> bool:
+    return request.headers.get("x-trace", "").lower() in ("1", "true", "yes")
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(input_data: ChatInput):
+async def chat_endpoint(input_data: ChatInput, request: Request, response: Response):
     try:
-        response_text = await run_chat_workflow(input_data.message, input_data.thread_id)
-        return {"response": response_text}
+        ctx = RequestContext(budget=REQUEST_BUDGET)
+        start = time.perf_counter()
+        response_text = await run_with_context(
+            ctx, run_chat_workflow(input_data.message, input_data.thread_id, input_data.idempotency_key)
+        )
+        if _wants_trace(request):
+            # Node path and per-node timings, e.g. `classify_intent;dur=1.2, general_chat;dur=840.0, total;dur=845.3`
+            response.headers["Server-Timing"] = metrics.format_trace(ctx.trace, time.perf_counter() - start)
+        return {"response": response_text, "degraded": ctx.degraded}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch_endpoint(input_data: ChatBatchInput):
+    """
+    Many (thread_id, message) turns in one request, e.g. for bulk jobs.
+    Intents are classified in batched prompts, threads run concurrently and
+    results come back in request order with per-item errors.
+    """
+    if len(input_data.items) > chat_batch.max_items:
+        raise HTTPException(status_code=413, detail=f"At most {chat_batch.max_items} items per batch")
+    results = await chat_batch.run([item.model_dump() for item in input_data.items], budget=REQUEST_BUDGET)
+    return {"results": results}
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+async def _chat_event_stream(input_data: ChatInput, trace: bool = False):
+    queue = asyncio.Queue()
+    ctx = RequestContext(token_sink=queue, budget=REQUEST_BUDGET)
+    start = time.perf_counter()
+    # The workflow runs in its own task so it finishes (and commits the thread
+    # state) even if the client goes away mid-stream.
+    task = asyncio.create_task(
+        run_with_context(ctx, run_chat_workflow(input_data.message, input_data.thread_id, input_data.idempotency_key))
+    )
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    while True:
+        chunk = await queue.get()
+        if chunk is None:
+            break
+        yield _sse("token", {"text": chunk})
+
+    try:
+        response_text = task.result()
+    except Exception as e:
+        yield _sse("error", {"detail": str(e)})
+        return
+    done = {"response": response_text, "degraded": ctx.degraded}
+    if trace:
+        done["trace"] = metrics.format_trace(ctx.trace, time.perf_counter() - start)
+    yield _sse("done", done)
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(input_data: ChatInput, request: Request):
+    """
+    Server-Sent Events version of /chat.
+    Emits `token` events while the reply is generated, then one `done` event with the full response.
+    """
+    return StreamingResponse(
+        _chat_event_stream(input_data, trace=_wants_trace(request)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/ws/{thread_id}")
+async def chat_socket_endpoint(websocket: WebSocket, thread_id: str):
+    """
+    One long-lived connection per chat session: acknowledges each message,
+    pushes streamed tokens and the final reply, and sends heartbeats.
+    See chat_socket.py for the message format. `?trace=1` adds node timings to `done`.
+    """
+    trace = websocket.query_params.get("trace", "").lower() in ("1", "true", "yes")
+    await chat_sockets.serve(websocket, thread_id, budget=REQUEST_BUDGET, trace=trace)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,178 @@
+import asyncio
+import functools
+import time
+from request_context import get_request_context
+
+# Minimal Prometheus text-format metrics, so /metrics works without extra dependencies.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _format_labels(labelnames, values) -> str:
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            for i, bound in enumerate(self.buckets):
+                bucket_labels = _format_labels(self.labelnames + ("le",), labels + (bound,))
+                lines.append(f"{self.name}_bucket{bucket_labels} {series[i]}")
+            inf_labels = _format_labels(self.labelnames + ("le",), labels + ("+Inf",))
+            lines.append(f"{self.name}_bucket{inf_labels} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+node_duration = registry.histogram("studybot_node_duration_seconds", "Wall time per graph node.", ("node",))
+node_calls = registry.counter("studybot_node_calls_total", "Graph node executions.", ("node",))
+node_errors = registry.counter("studybot_node_errors_total", "Graph node executions that raised.", ("node",))
+
+turn_duration = registry.histogram("studybot_turn_duration_seconds", "Wall time per chat turn, end to end.")
+graph_overhead = registry.histogram(
+    "studybot_graph_overhead_seconds", "Turn wall time not spent inside any node.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+llm_duration = registry.histogram("studybot_llm_duration_seconds", "Wall time per AIAgent method.", ("method",))
+llm_calls = registry.counter("studybot_llm_calls_total", "AIAgent method calls.", ("method",))
+llm_errors = registry.counter("studybot_llm_errors_total", "AIAgent calls that failed or timed out upstream.", ("method",))
+llm_degraded = registry.counter("studybot_llm_degraded_total", "AIAgent calls answered by the local fallback.", ("method",))
+llm_prompt_chars = registry.counter("studybot_llm_prompt_chars_total", "Characters sent to Gemini.", ("method",))
+llm_response_chars = registry.counter("studybot_llm_response_chars_total", "Characters received from Gemini.", ("method",))
+llm_tokens = registry.counter("studybot_llm_tokens_total", "Gemini token usage from response metadata.", ("method", "kind"))
+
+db_write_duration = registry.histogram("studybot_db_write_duration_seconds", "Wall time per bulk study plan insert.")
+
+def record_usage(method: str, prompt: str, text: str, response):
+    llm_prompt_chars.inc(method, amount=len(prompt))
+    llm_response_chars.inc(method, amount=len(text or ""))
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, field in (("prompt", "prompt_token_count"), ("response", "candidates_token_count"), ("total", "total_token_count")):
+        count = getattr(usage, field, None)
+        if count:
+            llm_tokens.inc(method, kind, amount=count)
+
+def _finish_node(name: str, start: float, failed: bool):
+    elapsed = time.perf_counter() - start
+    node_duration.observe(elapsed, name)
+    node_calls.inc(name)
+    if failed:
+        node_errors.inc(name)
+    ctx = get_request_context()
+    if ctx is not None:
+        ctx.trace.append((name, elapsed))
+
+def instrument_node(name: str, fn):
+    """Wraps a graph node (sync or async) to record its timing and the request trace."""
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(state):
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = await fn(state)
+                failed = False
+                return result
+            finally:
+                _finish_node(name, start, failed)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(state):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = fn(state)
+            failed = False
+            return result
+        finally:
+            _finish_node(name, start, failed)
+    return wrapper
+
+def format_trace(trace: list, total: float) -> str:
+    """Server-Timing style: `classify_intent;dur=1.2, general_chat;dur=840.0, total;dur=845.3`."""
+    parts = [f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in trace]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+def render_stats(stats: dict, prefix: str = "studybot") -> str:
+    """Flattens the nested GET /stats dict into Prometheus gauges (numeric leaves only)."""
+    lines = []
+
+    def walk(node, name):
+        for key, value in node.items():
+            metric = f"{name}_{key}"
+            if isinstance(value, dict):
+                walk(value, metric)
+            elif isinstance(value, bool):
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {int(value)}")
+            elif isinstance(value, (int, float)):
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+
+    walk(stats, prefix)
+    return "\n".join(lines) + "\n"
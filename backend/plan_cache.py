@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Canonical study habits (as produced by profile_extraction). Free-text habits
+# get advice written for them alone, so those plans are never shared
+KNOWN_HABITS = {"consistent", "last-minute", "procrastinator", "irregular"}
+
+PLACEHOLDERS = ("education_level", "subjects_count", "study_hours", "exam_timeline")
+PLACEHOLDER_RE = re.compile(r"\{(" + "|".join(PLACEHOLDERS) + r")\}")
+
+# Plans are generated as templates that write the profile values as
+# placeholders. Day, week, month, hour or subject counts still left in one
+# ("2 weeks", "Week 2", "2 subjects a day") were worked out from the original
+# student's numbers, so the plan would be wrong for the next student in the
+# bucket. Session and break lengths in minutes don't depend on the profile.
+PROFILE_NUMBER_RE = re.compile(
+    r"(?<![\w.])\d+(?:\.\d+)?\s*(?:-\s*\d+\s*)?"
+    r"(?:days?|weeks?|months?|hours?|hrs?|h|subjects?|courses?)\b"
+    r"|\b(?:day|week|month)\s*\d+"
+    r"|\d\s*(?:-|to)\s*\{\w+\}",
+    re.IGNORECASE,
+)
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+def profile_ranges(student_data: dict):
+    """
+    The buckets of the numeric fields, on the thresholds logic.generate_study_plan
+    uses: under 15 / 15-44 / 45+ days, under 3 / 3+ hours, up to 4 / more than 4
+    subjects. None when the numbers can't be read.
+    """
+    try:
+        days = int(student_data.get("exam_timeline"))
+        hours = float(student_data.get("study_hours"))
+        subjects = int(student_data.get("subjects_count"))
+    except (TypeError, ValueError):
+        return None
+    return {
+        "exam_timeline": "fewer than 15" if days < 15 else "15 to 44" if days < 45 else "45 or more",
+        "study_hours": "fewer than 3" if hours < 3 else "3 or more",
+        "subjects_count": "up to 4" if subjects <= 4 else "more than 4",
+    }
+
+def profile_key(student_data: dict):
+    """
+    Canonical profile for caching: education level, the profile_ranges buckets
+    and the study habit. None when the numbers can't be read or the habit
+    isn't one of KNOWN_HABITS (those plans are never cached).
+    """
+    ranges = profile_ranges(student_data)
+    habit = " ".join(str(student_data.get("study_habit") or "").lower().split())
+    if ranges is None or habit not in KNOWN_HABITS:
+        return None
+    education = " ".join(str(student_data.get("education_level") or "unknown").lower().split())
+    return "|".join([education, ranges["exam_timeline"], ranges["study_hours"], ranges["subjects_count"], habit])
+
+def placeholder_values(student_data: dict) -> dict:
+    values = {}
+    for field in PLACEHOLDERS:
+        value = student_data.get(field, "")
+        if field != "education_level":
+            try:
+                value = _format_number(float(value))
+            except (TypeError, ValueError):
+                pass
+        values[field] = str(value)
+    return values
+
+def fill_placeholders(text: str, values: dict) -> str:
+    """Replaces the {placeholders} in raw generated text; other braces are left alone."""
+    return PLACEHOLDER_RE.sub(lambda match: values[match.group(1)], text)
+
+def to_template(text: str) -> str:
+    """Raw generated text as a str.format template: placeholders kept, every other brace escaped."""
+    escaped = text.replace("{", "{{").replace("}", "}}")
+    return re.sub(r"\{\{(" + "|".join(PLACEHOLDERS) + r")\}\}", r"{\1}", escaped)
+
+def is_reusable(template: str) -> bool:
+    """False when the template still holds numbers that depend on the original student's profile."""
+    return PROFILE_NUMBER_RE.search(template) is None
+
+def personalize(template: str, student_data: dict) -> str:
+    """The cheap template pass: fills a cached plan's placeholders with this student's values."""
+    try:
+        return template.format(**placeholder_values(student_data))
+    except (KeyError, IndexError, ValueError):
+        return None
+
+class PlanCache:
+    """
+    Rendered study plans keyed on a bucketed student profile (see profile_key),
+    in a SQLite file capped at `max_entries` plans and `max_bytes` of Markdown.
+    The least recently used plans are evicted first.
+    """
+    def __init__(self, path: str = None, max_entries: int = None, max_bytes: int = None, enabled: bool = None):
+        self.path = path or os.getenv("PLAN_CACHE_PATH") or os.path.join(os.path.dirname(__file__), "plan_cache.db")
+        self.max_entries = max_entries or int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "2000"))
+        self.max_bytes = max_bytes or int(os.getenv("PLAN_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+        self.enabled = enabled if enabled is not None else os.getenv("PLAN_CACHE", "1") == "1"
+
+        self._conn = None
+        self._db_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.not_reusable = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use so importing the module stays free of disk I/O
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                "key TEXT PRIMARY KEY, template TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS plans_last_used ON plans(last_used)")
+        return self._conn
+
+    @staticmethod
+    def _digest(key: str) -> str:
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _select(self, digest: str):
+        with self._db_lock:
+            conn = self._connect()
+            row = conn.execute("SELECT template FROM plans WHERE key = ?", (digest,)).fetchone()
+            if row:
+                conn.execute("UPDATE plans SET last_used = ? WHERE key = ?", (time.time(), digest))
+            return row[0] if row else None
+
+    def _insert(self, digest: str, template: str):
+        size = len(template.encode())
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO plans (key, template, size, last_used) VALUES (?, ?, ?, ?)",
+                    (digest, template, size, time.time()),
+                )
+                count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM plans").fetchone()
+                evicted = 0
+                for key, row_size in conn.execute("SELECT key, size FROM plans ORDER BY last_used").fetchall():
+                    if count <= self.max_entries and total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM plans WHERE key = ?", (key,))
+                    count -= 1
+                    total -= row_size
+                    evicted += 1
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return evicted
+
+    async def get(self, student_data: dict):
+        """A cached plan personalized for this student, or None."""
+        key = profile_key(student_data) if self.enabled else None
+        if key is None:
+            return None
+        try:
+            template = await asyncio.to_thread(self._select, self._digest(key))
+        except sqlite3.Error as e:
+            logger.warning(f"Plan cache lookup failed: {e}")
+            template = None
+        plan = personalize(template, student_data) if template else None
+        if plan is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return plan
+
+    async def put(self, student_data: dict, template: str):
+        """Stores a plan template (see to_template) for this student's bucket, if it is reusable."""
+        key = profile_key(student_data) if self.enabled else None
+        if key is None or not template:
+            return
+        if not is_reusable(template):
+            self.not_reusable += 1
+            return
+        try:
+            self.evictions += await asyncio.to_thread(self._insert, self._digest(key), template)
+            self.stores += 1
+        except sqlite3.Error as e:
+            logger.warning(f"Plan cache store failed: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "not_reusable": self.not_reusable,
+            "evictions": self.evictions,
+        }
+
+# Singleton instance
+plan_cache = PlanCache()
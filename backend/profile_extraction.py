@@ -0,0 +1,205 @@
+import re
+
+# Fields data_collection_node needs before a plan can be generated, in the order they are asked for
+REQUIRED_FIELDS = [
+    ("education_level", "What is your current education level? (e.g., High School, College)"),
+    ("subjects_count", "How many subjects are you focusing on?"),
+    ("study_hours", "How many hours can you dedicate to studying daily?"),
+    ("exam_timeline", "When are your exams starting? (e.g., in 2 weeks, 10 days)"),
+    ("study_habit", "How would you describe your study habits? (e.g., Consistent, Last-minute, Procrastinator)"),
+]
+
+FIELD_DESCRIPTIONS = {
+    "education_level": "your education level",
+    "subjects_count": "how many subjects you're studying",
+    "study_hours": "how many hours a day you can study",
+    "exam_timeline": "when your exams start",
+    "study_habit": "how you'd describe your study habits",
+}
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+}
+_NUM = r"(\d+(?:\.\d+)?|" + "|".join(NUMBER_WORDS) + r")"
+
+EDUCATION_PATTERNS = [
+    (r"\b(middle school|junior high)\b", "Middle School"),
+    (r"\b(high school|secondary school|grade (9|10|11|12)|class (9|10|11|12)|a[- ]levels?)\b", "High School"),
+    (r"\b(master'?s|phd|doctorate|postgrad\w*|graduate school|grad school)\b", "Postgraduate"),
+    (r"\b(university|undergrad\w*|bachelor'?s)\b", "University"),
+    (r"\b(college)\b", "College"),
+]
+
+HABIT_PATTERNS = [
+    (r"\b(procrastinat\w*)\b", "Procrastinator"),
+    (r"\b(last[- ]minute|cram\w*)\b", "Last-minute"),
+    (r"\b(irregular|inconsistent|on and off)\b", "Irregular"),
+    (r"\b(consistent\w*|disciplined)\b", "Consistent"),
+]
+# Usually describe study hours ("3 hours every day"), so they only count as a
+# habit when answering the habit question
+HABIT_ANSWER_PATTERNS = [
+    (r"\b(regular\w*|every day|everyday|daily|routine)\b", "Consistent"),
+]
+
+SUBJECTS_RE = re.compile(_NUM + r"\s*(subjects?|courses?|classes|papers|modules|exams)\b")
+HOURS_RE = re.compile(_NUM + r"\s*(h|hrs?|hours?)\b")
+MINUTES_RE = re.compile(_NUM + r"\s*(m|mins?|minutes?)\b")
+TIMELINE_RE = re.compile(_NUM + r"\s*(days?|weeks?|months?)\b")
+# "5 days a week" is a study frequency, not a timeline
+FREQUENCY_AFTER_RE = re.compile(r"^\s*(a|an|per|each|every|/)\s*(day|week|month)\b")
+HOURS_LEFT_RE = re.compile(r"^\s*(left|away|to go|until|till|before)\b")
+EXAM_WORD_RE = re.compile(r"\b(exams?|tests?|finals|boards|midterms?|papers?)\b")
+TIMELINE_WORDS = [
+    (re.compile(r"\btomorrow\b"), 1),
+    (re.compile(r"\bin (a|one) week\b|\bnext week\b"), 7),
+    (re.compile(r"\bin (a|one) month\b|\bnext month\b"), 30),
+]
+BARE_NUMBER_RE = re.compile(r"^\s*" + _NUM + r"\s*[.!]?\s*$")
+
+UNIT_DAYS = {"day": 1, "week": 7, "month": 30}
+NUMERIC_FIELDS = ("subjects_count", "study_hours", "exam_timeline")
+
+def _number(token: str) -> float:
+    return float(NUMBER_WORDS.get(token, token))
+
+def _first_match(patterns, text: str):
+    for pattern, label in patterns:
+        if re.search(pattern, text):
+            return label
+    return None
+
+def _timeline_score(text: str, match) -> int:
+    """How much a "N <unit>" match reads as time until the exams: 2 for "in N ...", +1 next to an exam word."""
+    before = text[max(0, match.start() - 25):match.start()]
+    after = text[match.end():match.end() + 25]
+    score = 0
+    if re.search(r"\b(in|within|after)\s*$", before):
+        score += 2
+    if EXAM_WORD_RE.search(before) or EXAM_WORD_RE.search(after):
+        score += 1
+    return score
+
+def _timeline_match(text: str):
+    """
+    The "N days/weeks/months" that most likely means time until the exams:
+    frequencies ("5 days a week") are skipped, and "in N ..." or a nearby
+    exam word wins over the first match.
+    """
+    best, best_score = None, -1
+    for match in TIMELINE_RE.finditer(text):
+        if FREQUENCY_AFTER_RE.match(text[match.end():]):
+            continue
+        score = _timeline_score(text, match)
+        if score > best_score:
+            best, best_score = match, score
+    return best
+
+def _hours_matches(text: str) -> tuple:
+    """
+    (study hours match, exam-in-hours match) among the "N hours" in `text`.
+    "exams in 48 hours" is a timeline; "3 hours a day" never is.
+    """
+    hours, timeline = None, None
+    for match in HOURS_RE.finditer(text):
+        # A nearby exam word alone isn't enough here: "2 hours, exams in 3 months"
+        countdown = _timeline_score(text, match) >= 2 or HOURS_LEFT_RE.match(text[match.end():])
+        if countdown and not FREQUENCY_AFTER_RE.match(text[match.end():]):
+            timeline = timeline or match
+        else:
+            hours = hours or match
+    return hours, timeline
+
+def normalize_number(field: str, value):
+    """Coerces a field value into the numeric form logic.generate_study_plan expects, or None."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if field == "study_hours":
+        return round(number, 2)
+    return int(round(number))
+
+def normalize_fields(fields: dict) -> dict:
+    """Cleans extracted values (e.g. from the LLM): numbers for numeric fields, trimmed text otherwise."""
+    normalized = {}
+    for field, value in fields.items():
+        if field in NUMERIC_FIELDS:
+            value = normalize_number(field, value)
+        elif isinstance(value, str):
+            value = value.strip()
+        if value not in (None, ""):
+            normalized[field] = value
+    return normalized
+
+def extract_fields(message: str, expected_field: str = None) -> dict:
+    """
+    Pulls every study-plan field it can from one message with regexes, e.g.
+    "college, 4 subjects, 3h a day, exams in 2 weeks" gives education level,
+    subjects_count=4, study_hours=3.0 and exam_timeline=14 (days).
+    A bare number ("4") is taken as the answer to `expected_field`.
+    """
+    text = message.lower().replace("’", "'")
+    found = {}
+
+    education = _first_match(EDUCATION_PATTERNS, text)
+    if education:
+        found["education_level"] = education
+
+    habit = _first_match(HABIT_PATTERNS, text)
+    if not habit and expected_field == "study_habit":
+        habit = _first_match(HABIT_ANSWER_PATTERNS, text)
+    if habit:
+        found["study_habit"] = habit
+
+    match = SUBJECTS_RE.search(text)
+    if match:
+        found["subjects_count"] = int(_number(match.group(1)))
+
+    match, hours_timeline = _hours_matches(text)
+    if match:
+        found["study_hours"] = _number(match.group(1))
+    else:
+        match = MINUTES_RE.search(text)
+        if match:
+            found["study_hours"] = round(_number(match.group(1)) / 60, 2)
+
+    match = _timeline_match(text)
+    if match:
+        unit = match.group(2).rstrip("s")
+        found["exam_timeline"] = int(_number(match.group(1)) * UNIT_DAYS[unit])
+    elif hours_timeline:
+        found["exam_timeline"] = max(1, round(_number(hours_timeline.group(1)) / 24))
+    else:
+        for pattern, days in TIMELINE_WORDS:
+            if pattern.search(text):
+                found["exam_timeline"] = days
+                break
+
+    match = BARE_NUMBER_RE.match(text)
+    if match and expected_field in NUMERIC_FIELDS:
+        found[expected_field] = normalize_number(expected_field, _number(match.group(1)))
+
+    return found
+
+def missing_fields(student_data: dict) -> list:
+    return [field for field, _ in REQUIRED_FIELDS if field not in student_data]
+
+def next_question(student_data: dict, combined: bool = False):
+    """
+    The question for whatever is still missing. With `combined`, all missing
+    fields are asked for in one prompt; otherwise only the first one is, so a
+    bare answer ("4") maps to it unambiguously.
+    """
+    missing = missing_fields(student_data)
+    if not missing:
+        return None
+    if len(missing) == 1 or not combined:
+        return dict(REQUIRED_FIELDS)[missing[0]]
+    wanted = [FIELD_DESCRIPTIONS[field] for field in missing]
+    listing = ", ".join(wanted[:-1]) + " and " + wanted[-1]
+    return (
+        f"To build your plan I need {listing}. "
+        "You can answer in one message, e.g. \"College, 4 subjects, 3h a day, exams in 2 weeks, procrastinator\"."
+    )
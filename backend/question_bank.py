@@ -0,0 +1,260 @@
+"""
+Local practice-question bank.
+
+Questions live in question_bank/questions.jsonl ({"topic", "question",
+"answer", "source"} per line). Each question is indexed as a hashed TF-IDF
+vector; the (n, dim) float32 matrix of L2-normalized rows is saved as
+index.npy and opened memory-mapped, so a topic lookup is one matrix-vector
+product plus a top-k partition.
+
+    python question_bank.py ingest questions.csv more.json
+    python question_bank.py search "cell biology"
+
+CSV files need topic, question and answer columns; JSON files hold a list of
+such objects (or {"questions": [...]}).
+"""
+import csv
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEED_FILE = Path(__file__).parent / "data" / "practice_questions.json"
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Request phrasing ("give me a quiz on ...") says nothing about the topic
+STOP_WORDS = {
+    "a", "an", "and", "are", "about", "can", "could", "do", "does", "for", "from", "give", "how", "i",
+    "in", "is", "it", "me", "my", "of", "on", "or", "please", "quiz", "question", "questions", "practice",
+    "some", "test", "the", "this", "to", "what", "which", "why", "with", "would", "you", "your", "want",
+    "need", "help", "exam", "exams", "us", "let", "lets", "more", "few", "be", "by", "at", "as",
+}
+
+def _fold_plural(token: str) -> str:
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> list:
+    return [_fold_plural(token) for token in TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS and len(token) > 1]
+
+def clean_topic(message: str) -> str:
+    """
+    The topic words of a request: "Quiz me on photosynthesis!" -> "photosynthesis".
+    Stray letters ("what's" -> "s") go, as in tokenize(); single digits stay ("World War 2").
+    """
+    return " ".join(token for token in TOKEN_RE.findall(message.lower()) if token not in STOP_WORDS and (len(token) > 1 or token.isdigit()))
+
+def _question_key(question: str) -> str:
+    return " ".join(TOKEN_RE.findall(question.lower()))
+
+def format_questions(topic: str, records: list) -> str:
+    lines = [f"**Here are some practice questions on {topic}:**", ""]
+    lines += [f"{i}. {record['question']}" for i, record in enumerate(records, 1)]
+    answers = [(i, record.get("answer")) for i, record in enumerate(records, 1) if record.get("answer")]
+    if answers:
+        lines += ["", "**Answers**", ""]
+        lines += [f"{i}. {answer}" for i, answer in answers]
+    return "\n".join(lines)
+
+def load_question_file(path) -> list:
+    """Question records from a .csv or .json file."""
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        rows = data.get("questions", []) if isinstance(data, dict) else data
+    return [
+        {
+            "topic": str(row.get("topic") or "").strip(),
+            "question": str(row.get("question") or "").strip(),
+            "answer": str(row.get("answer") or "").strip(),
+            "source": str(row.get("source") or path.name),
+        }
+        for row in rows
+        if row.get("question")
+    ]
+
+class QuestionBank:
+    """
+    Topic lookups against the local bank. lookup() returns questions when at
+    least `min_hits` of them score `min_score` or better, otherwise None so
+    the caller can backfill the topic from Gemini and add() the result.
+    """
+    def __init__(self, path=None, dim: int = None, min_score: float = None, min_hits: int = None):
+        self.path = Path(path or os.getenv("QUESTION_BANK_DIR") or Path(__file__).parent / "question_bank")
+        self.dim = dim or int(os.getenv("QUESTION_BANK_DIM", "1024"))
+        self.min_score = min_score if min_score is not None else float(os.getenv("QUESTION_BANK_MIN_SCORE", "0.2"))
+        self.min_hits = min_hits or int(os.getenv("QUESTION_BANK_MIN_HITS", "3"))
+
+        self.records = []
+        self._keys = set()
+        self._index = None
+        self._idf = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self.misses = 0
+        self.added = 0
+
+    @property
+    def _questions_file(self) -> Path:
+        return self.path / "questions.jsonl"
+
+    def load(self):
+        """Reads the records and maps the index, rebuilding it if it is stale."""
+        with self._lock:
+            if self._loaded:
+                return
+            if self._questions_file.exists():
+                with self._questions_file.open(encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            self._remember(json.loads(line))
+            try:
+                index = np.load(self.path / "index.npy", mmap_mode="r")
+                idf = np.load(self.path / "idf.npy")
+                if index.shape == (len(self.records), self.dim):
+                    self._index, self._idf = index, idf
+            except (OSError, ValueError):
+                pass
+            self._loaded = True
+
+        if not self.records and SEED_FILE.exists():
+            self.add(load_question_file(SEED_FILE))
+        elif self._index is None and self.records:
+            with self._lock:
+                self._rebuild()
+
+    def _remember(self, record: dict) -> bool:
+        key = _question_key(record["question"])
+        if not key or key in self._keys:
+            return False
+        self._keys.add(key)
+        self.records.append(record)
+        return True
+
+    def _counts(self, texts: list) -> np.ndarray:
+        counts = np.zeros((len(texts), self.dim), dtype=np.float32)
+        rows, cols = [], []
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                rows.append(row)
+                cols.append(zlib.crc32(token.encode()) % self.dim)
+        np.add.at(counts, (rows, cols), 1.0)
+        # Sub-linear term frequency
+        return np.log1p(counts, out=counts)
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def _rebuild(self):
+        # The topic is repeated so it weighs more than incidental question words
+        texts = [f"{r['topic']} {r['topic']} {r['question']}" for r in self.records]
+        tf = self._counts(texts)
+        df = np.count_nonzero(tf, axis=0)
+        idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        index = self._normalize(tf * idf)
+        # Swap in the in-memory copy first so the old memory map is released before its file is replaced
+        self._index, self._idf = index, idf
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        try:
+            for name, array in (("index.npy", index), ("idf.npy", idf)):
+                tmp = self.path / f"{name}.tmp"
+                with tmp.open("wb") as f:
+                    np.save(f, array)
+                os.replace(tmp, self.path / name)
+        except OSError as e:
+            logger.warning(f"Could not save question index, it will be rebuilt on next start: {e}")
+
+    def search(self, topic: str, k: int = 10) -> list:
+        """Top-k (score, record) pairs by cosine similarity, best first."""
+        if not self._loaded:
+            self.load()
+        index, idf = self._index, self._idf
+        if index is None or not len(index):
+            return []
+        query = self._normalize(self._counts([topic])[0] * idf)
+        if not query.any():
+            return []
+        scores = index @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.records[i]) for i in top if scores[i] > 0]
+
+    def lookup(self, topic: str, count: int = 3):
+        """`count` well-matching questions for a topic (varied between calls), or None on poor coverage."""
+        self.lookups += 1
+        matches = [record for score, record in self.search(topic, k=count * 3) if score >= self.min_score]
+        if len(matches) < max(self.min_hits, count):
+            self.misses += 1
+            return None
+        self.hits += 1
+        picked = sorted(random.sample(range(len(matches)), count))
+        return [matches[i] for i in picked]
+
+    def add(self, records: list) -> int:
+        """Appends new (deduplicated) questions and re-indexes. Blocking; use a thread from async code."""
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            fresh = [record for record in records if self._remember(record)]
+            if not fresh:
+                return 0
+            self.path.mkdir(parents=True, exist_ok=True)
+            with self._questions_file.open("a", encoding="utf-8") as f:
+                for record in fresh:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._rebuild()
+            self.added += len(fresh)
+            return len(fresh)
+
+    def stats(self) -> dict:
+        return {
+            "questions": len(self.records),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "added": self.added,
+        }
+
+# Singleton instance
+question_bank = QuestionBank()
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("ingest", "search"):
+        print(__doc__)
+        sys.exit(1)
+    if sys.argv[1] == "ingest":
+        for file in sys.argv[2:]:
+            print(f"{file}: {question_bank.add(load_question_file(file))} new question(s)")
+        print(f"bank now holds {len(question_bank.records)} questions")
+    else:
+        question_bank.load()
+        topic = " ".join(sys.argv[2:])
+        start = time.perf_counter()
+        results = question_bank.search(topic)
+        elapsed = (time.perf_counter() - start) * 1000
+        for score, record in results:
+            print(f"{score:.3f}  [{record['topic']}] {record['question']}")
+        print(f"{len(results)} result(s) in {elapsed:.2f} ms")
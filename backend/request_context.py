@@ -0,0 +1,54 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+# Per-request state that has to reach code deep inside the graph (e.g. the
+# AIAgent calls made by a node) without threading it through AgentState.
+# asyncio tasks copy the context when they are created, so anything the graph
+# spawns for a request sees the same RequestContext object.
+
+
+class RequestContext:
+    def __init__(self, token_sink: Optional[asyncio.Queue] = None, budget: Optional[float] = None):
+        # When set, streamed LLM output is pushed here chunk by chunk.
+        self.token_sink = token_sink
+        # Absolute (monotonic) time by which the whole request should be answered
+        self.deadline = time.monotonic() + budget if budget else None
+        # Set when any part of the reply came from the degraded (logic.py) path.
+        self.degraded = False
+        # (node name, seconds) for each graph node run during this request
+        self.trace = []
+        # Intent already classified for this message (e.g. by /chat/batch); skips classification
+        self.intent_hint = None
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def streaming(self) -> bool:
+        return self.token_sink is not None
+
+    async def emit(self, text: str):
+        if self.token_sink is not None and text:
+            await self.token_sink.put(text)
+
+
+current_request: ContextVar[Optional[RequestContext]] = ContextVar("current_request", default=None)
+
+
+def get_request_context() -> Optional[RequestContext]:
+    return current_request.get()
+
+
+async def run_with_context(ctx: RequestContext, coro):
+    """
+    Awaits `coro` with `ctx` installed as the current request context.
+    """
+    token = current_request.set(ctx)
+    try:
+        return await coro
+    finally:
+        current_request.reset(token)
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open."""
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    # google.api_core exceptions carry the HTTP status as `.code`
+    code = getattr(exc, "code", None)
+    try:
+        return int(code) in RETRYABLE_CODES
+    except (TypeError, ValueError):
+        return False
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive upstream failures and rejects
+    calls for `reset_timeout` seconds. Then a single probe call is let through
+    (half-open): success closes the circuit, failure re-opens it.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self._failures = 0
+        self._probe_in_flight = False
+        self.state = "closed"
+
+    def release_probe(self):
+        """The probe ended without an answer (cancelled); the next call probes instead."""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+class ResilientCaller:
+    """
+    Runs upstream attempts with a per-attempt timeout, jittered exponential
+    retries for retryable errors, an optional hedged second request once an
+    attempt outlives the p95 observed for the same method, and a circuit
+    breaker in front.
+    """
+    def __init__(self):
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.attempt_timeout = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "15"))
+        self.backoff_base = float(os.getenv("LLM_BACKOFF_BASE", "0.25"))
+        self.backoff_max = float(os.getenv("LLM_BACKOFF_MAX", "4"))
+        self.hedge = os.getenv("LLM_HEDGE", "1") == "1"
+        self.hedge_min_samples = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30")),
+        )
+
+        self._latencies = {}  # method -> recent attempt latencies
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self, method: str):
+        """Observed p95 attempt latency for `method`, or None until there are enough samples."""
+        latencies = self._latencies.get(method, ())
+        if len(latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    async def call(self, attempt, budget: float, method: str = "default", hedge: bool = True, can_retry=None):
+        """
+        Calls `attempt()` (a coroutine factory) until it succeeds, fails with a
+        non-retryable error, or `budget` seconds are used up.
+        `method` keys the latency samples behind the hedge delay, so short
+        calls don't get long generations hedged. `can_retry()`, if given, can
+        veto a retry (e.g. once streamed output has already reached the client).
+        """
+        deadline = time.monotonic() + budget
+        for retry in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError("Gemini circuit breaker is open")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+
+            timeout = min(self.attempt_timeout, remaining)
+            start = time.monotonic()
+            try:
+                if hedge and self.hedge:
+                    result = await self._hedged(attempt, timeout, self.hedge_delay(method))
+                else:
+                    result = await asyncio.wait_for(attempt(), timeout=timeout)
+            except asyncio.CancelledError:
+                # Cancelled from outside (e.g. the request deadline): says nothing
+                # about the upstream, but a half-open probe must not stay claimed
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    # Not the upstream's fault (bad request, unparseable reply, ...)
+                    self.breaker.record_success()
+                if not retryable or retry == self.max_retries or (can_retry and not can_retry()):
+                    raise
+                backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** retry))
+                if time.monotonic() + backoff >= deadline:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(backoff)
+                continue
+
+            self._latencies.setdefault(method, deque(maxlen=200)).append(time.monotonic() - start)
+            self.breaker.record_success()
+            return result
+
+    async def _hedged(self, attempt, timeout: float, delay):
+        if delay is None or delay >= timeout:
+            return await asyncio.wait_for(attempt(), timeout=timeout)
+
+        deadline = time.monotonic() + timeout
+        primary = asyncio.create_task(attempt())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                # Primary is slower than p95: race a second request against it
+                self.hedges += 1
+                tasks.add(asyncio.create_task(attempt()))
+
+            error = None
+            while tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                done, _ = await asyncio.wait(tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict:
+        delays = {method: self.hedge_delay(method) for method in self._latencies}
+        return {
+            "circuit_state": self.breaker.state,
+            "circuit_open": self.breaker.state != "closed",
+            "circuit_opened": self.breaker.opened,
+            "circuit_rejected": self.breaker.rejected,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay_s": {method: round(delay, 3) for method, delay in sorted(delays.items()) if delay is not None},
+        }
@@ -0,0 +1,126 @@
+import os
+import time
+from collections import OrderedDict
+
+def new_state() -> dict:
+    return {
+        "messages": [],
+        "intent": None,
+        "student_data": {},
+        "next_question": None,
+        "plan_generated": False,
+        "pending_response": None,
+        "summary": "",
+    }
+
+def copy_state(state: dict) -> dict:
+    # Callers mutate `messages` and `student_data` in place, so hand out
+    # private copies rather than the stored objects.
+    state = dict(state)
+    state["messages"] = list(state.get("messages") or [])
+    state["student_data"] = dict(state.get("student_data") or {})
+    return state
+
+def trim_messages(state: dict, max_messages: int) -> dict:
+    if max_messages and len(state["messages"]) > max_messages:
+        state["messages"] = state["messages"][-max_messages:]
+    return state
+
+def estimate_state_size(state: dict) -> int:
+    """Rough byte size of a thread's state (text payload plus fixed overhead)."""
+    size = 256
+    size += sum(len(m) for m in state.get("messages", []))
+    size += sum(len(str(k)) + len(str(v)) for k, v in state.get("student_data", {}).items())
+    size += len(state.get("next_question") or "")
+    size += len(state.get("summary") or "")
+    return size
+
+class SessionStore:
+    """
+    In-process thread state store.
+    Entries expire after `idle_ttl` seconds without a turn, the least recently
+    used threads are evicted past `max_entries` / `max_bytes`, and only the last
+    `max_messages` messages of each thread are kept.
+    """
+    def __init__(self, max_entries: int = None, max_bytes: int = None, idle_ttl: float = None, max_messages: int = None):
+        self.max_entries = max_entries or int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+        self.max_bytes = max_bytes or int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+        self.idle_ttl = idle_ttl or float(os.getenv("SESSION_IDLE_TTL", "7200"))
+        self.max_messages = max_messages or int(os.getenv("SESSION_MAX_MESSAGES", "20"))
+
+        self._sessions = OrderedDict()  # thread_id -> (last_seen, state, size)
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    async def load(self, thread_id: str) -> dict:
+        entry = self._sessions.get(thread_id)
+        if entry is None:
+            return new_state()
+        last_seen, state, _ = entry
+        if time.monotonic() - last_seen > self.idle_ttl:
+            self._remove(thread_id)
+            self.expirations += 1
+            return new_state()
+        return copy_state(state)
+
+    async def save(self, thread_id: str, state: dict):
+        state = trim_messages(copy_state(state), self.max_messages)
+        size = estimate_state_size(state)
+        if thread_id in self._sessions:
+            self._remove(thread_id)
+        self._sessions[thread_id] = (time.monotonic(), state, size)
+        self.bytes += size
+        self._expire_idle()
+        while len(self._sessions) > self.max_entries or self.bytes > self.max_bytes:
+            oldest = next(iter(self._sessions))
+            if oldest == thread_id:
+                break
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _expire_idle(self):
+        # Entries are kept in last-seen order, so expired ones sit at the front
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions))
+            if self._sessions[oldest][0] > cutoff:
+                break
+            self._remove(oldest)
+            self.expirations += 1
+
+    def _remove(self, thread_id: str):
+        _, _, size = self._sessions.pop(thread_id)
+        self.bytes -= size
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "live_sessions": len(self._sessions),
+            "approx_bytes": self.bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "max_messages": self.max_messages,
+        }
+
+def create_session_store():
+    """
+    STATE_BACKEND=memory (default) keeps sessions in this process.
+    STATE_BACKEND=sqlite shares them between workers through STATE_DB_PATH.
+    """
+    backend = os.getenv("STATE_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        from sqlite_store import SqliteSessionStore
+        return SqliteSessionStore()
+    return SessionStore()
+
+# Singleton instance
+session_store = create_session_store()
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from session_store import new_state, copy_state, trim_messages
+
+logger = logging.getLogger(__name__)
+
+class SqliteSessionStore:
+    """
+    Thread state store on a local SQLite database in WAL mode, so several
+    uvicorn workers on one box share sessions and they survive restarts.
+
+    Saves are buffered and written in one transaction per batch, at most
+    `flush_interval` seconds after the turn (or sooner once `batch_size`
+    threads are pending). Loads check the local buffer first. Another worker
+    can therefore see a state up to `flush_interval` old, which is far shorter
+    than the gap between two turns of a real user.
+    """
+    def __init__(self, path: str = None, flush_interval: float = None, batch_size: int = None,
+                 idle_ttl: float = None, max_entries: int = None, max_messages: int = None):
+        self.path = path or os.getenv("STATE_DB_PATH") or os.path.join(os.path.dirname(__file__), "state.db")
+        self.flush_interval = flush_interval or float(os.getenv("STATE_FLUSH_INTERVAL", "0.05"))
+        self.batch_size = batch_size or int(os.getenv("STATE_FLUSH_BATCH", "64"))
+        self.idle_ttl = idle_ttl or float(os.getenv("SESSION_IDLE_TTL", "7200"))
+        self.max_entries = max_entries or int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+        self.max_messages = max_messages or int(os.getenv("SESSION_MAX_MESSAGES", "20"))
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db_lock = threading.Lock()
+        with self._db_lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS threads ("
+                "thread_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS threads_updated_at ON threads(updated_at)")
+
+        self._pending = {}  # thread_id -> (updated_at, serialized state)
+        self._flushing = {}  # batch being written; still served by load() until it is committed
+        self._wakeup = None
+        self._flusher = None
+        self._last_prune = 0.0
+
+        self.flushes = 0
+        self.rows_written = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.live_sessions = 0
+        self.approx_bytes = 0
+
+    async def load(self, thread_id: str) -> dict:
+        pending = self._pending.get(thread_id) or self._flushing.get(thread_id)
+        if pending is not None:
+            return copy_state(json.loads(pending[1]))
+
+        row = await asyncio.to_thread(self._select, thread_id)
+        if row is None:
+            return new_state()
+        state_json, updated_at = row
+        if time.time() - updated_at > self.idle_ttl:
+            return new_state()
+        return copy_state(json.loads(state_json))
+
+    async def save(self, thread_id: str, state: dict):
+        state = trim_messages(copy_state(state), self.max_messages)
+        self._pending[thread_id] = (time.time(), json.dumps(state))
+        self._ensure_flusher()
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._pending:
+                await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self._flushing = batch
+        rows = [(thread_id, state_json, updated_at) for thread_id, (updated_at, state_json) in batch.items()]
+        try:
+            await asyncio.to_thread(self._write, rows)
+        except Exception:
+            logger.exception("Failed to persist %d thread states; will retry", len(rows))
+            # Put the batch back unless a newer state arrived in the meantime
+            for thread_id, entry in batch.items():
+                self._pending.setdefault(thread_id, entry)
+            return
+        finally:
+            self._flushing = {}
+        self.flushes += 1
+        self.rows_written += len(rows)
+
+        if time.time() - self._last_prune > 60:
+            self._last_prune = time.time()
+            await asyncio.to_thread(self._prune)
+
+    def _select(self, thread_id: str):
+        with self._db_lock:
+            return self._conn.execute(
+                "SELECT state, updated_at FROM threads WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+
+    def _write(self, rows: list):
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO threads (thread_id, state, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(thread_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _prune(self):
+        with self._db_lock:
+            cursor = self._conn.execute("DELETE FROM threads WHERE updated_at < ?", (time.time() - self.idle_ttl,))
+            self.expirations += cursor.rowcount
+            cursor = self._conn.execute(
+                "DELETE FROM threads WHERE thread_id IN ("
+                "SELECT thread_id FROM threads ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.evictions += cursor.rowcount
+            self.live_sessions, self.approx_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(state)), 0) FROM threads"
+            ).fetchone()
+
+    async def close(self):
+        """Stops the flusher and writes out anything still buffered."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "live_sessions": self.live_sessions,
+            "approx_bytes": self.approx_bytes,
+            "pending_writes": len(self._pending),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "max_entries": self.max_entries,
+            "max_messages": self.max_messages,
+        }
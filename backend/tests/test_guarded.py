@@ -0,0 +1,25 @@
+import asyncio
+import time
+
+from ai_agent import ai_agent
+from request_context import RequestContext, run_with_context
+
+def test_spent_budget_degrades_without_recording_a_timeout():
+    calls = []
+
+    async def primary():
+        calls.append(1)
+        return "from gemini"
+
+    ctx = RequestContext(budget=0.01)
+    ctx.deadline = time.monotonic() - 1
+    before = ai_agent.shedder.stats()
+
+    result = asyncio.run(run_with_context(ctx, ai_agent._guarded("generate_response", primary, lambda: "fallback")))
+
+    after = ai_agent.shedder.stats()
+    assert result == "fallback"
+    assert ctx.degraded
+    assert calls == []
+    assert after["upstream_calls"] == before["upstream_calls"]
+    assert after["timeouts"] == before["timeouts"]
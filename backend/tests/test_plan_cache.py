@@ -0,0 +1,60 @@
+import asyncio
+import sqlite3
+
+from plan_cache import PlanCache, fill_placeholders, is_reusable, personalize, placeholder_values, profile_key, to_template
+
+PROFILE = {"education_level": "College", "subjects_count": 4, "study_hours": 3, "exam_timeline": 12,
+           "study_habit": "Procrastinator"}
+
+def test_profile_key_buckets_on_plan_thresholds():
+    similar = dict(PROFILE, subjects_count=2, study_hours=5.5, exam_timeline=3, education_level="college")
+    assert profile_key(similar) == profile_key(PROFILE)
+    assert profile_key(dict(PROFILE, exam_timeline=20)) != profile_key(PROFILE)
+    assert profile_key(dict(PROFILE, exam_timeline="soon")) is None
+    # Free-text habits get their own advice, so they are not shared
+    assert profile_key(dict(PROFILE, study_habit="I study at night")) is None
+
+def test_template_round_trip():
+    text = "Plan for {education_level}: {exam_timeline} days, {subjects_count} subjects, {study_hours} hours a day. Review {notes}."
+    template = to_template(text)
+    other = dict(PROFILE, subjects_count=2, study_hours=5, exam_timeline=9)
+    expected = "Plan for College: 9 days, 2 subjects, 5 hours a day. Review {notes}."
+    assert personalize(template, other) == expected
+    assert fill_placeholders(text, placeholder_values(other)) == expected
+
+def test_session_schedule_is_reusable():
+    plan = (
+        "You have {exam_timeline} days and {study_hours} hours a day.\n"
+        "- Session 1 (50 minutes)\n- Break (10 min)\n- Session 2 (25 min)\n- Day 1 of each cycle: review\n"
+    )
+    assert not is_reusable(to_template(plan))  # "Day 1" counts days
+    assert is_reusable(to_template(plan.replace("- Day 1 of each cycle: review\n", "")))
+
+def test_plans_with_derived_numbers_are_not_reused(tmp_path):
+    plan = "With {exam_timeline} days left, you have 2 weeks. Week 2 is revision, 2 subjects a day."
+    assert not is_reusable(to_template(plan))
+
+    cache = PlanCache(path=str(tmp_path / "plans.db"), enabled=True)
+
+    async def scenario():
+        await cache.put(PROFILE, to_template(plan))
+        return await cache.get(PROFILE)
+
+    assert asyncio.run(scenario()) is None
+    assert cache.not_reusable == 1
+
+def test_failed_insert_rolls_back(tmp_path):
+    cache = PlanCache(path=str(tmp_path / "plans.db"), enabled=True)
+
+    async def scenario():
+        await cache.put(PROFILE, "First plan")
+        conn = cache._connect()
+        conn.execute("CREATE TRIGGER fail BEFORE INSERT ON plans BEGIN SELECT RAISE(ABORT, 'forced'); END")
+        await cache.put(dict(PROFILE, exam_timeline=60), "Second plan")
+        conn.execute("DROP TRIGGER fail")
+        assert not conn.in_transaction
+        await cache.put(dict(PROFILE, exam_timeline=60), "Second plan")
+        return await cache.get(dict(PROFILE, exam_timeline=60))
+
+    assert asyncio.run(scenario()) == "Second plan"
+    assert cache.stores == 2
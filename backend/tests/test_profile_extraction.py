@@ -0,0 +1,56 @@
+import pytest
+
+from profile_extraction import extract_fields
+
+@pytest.mark.parametrize("message, expected", [
+    ("exams in 2 weeks", 14),
+    ("10 days", 10),
+    ("tomorrow", 1),
+    ("my finals are next month", 30),
+    ("I can study 2 hours, 5 days a week, exams in 3 months", 90),
+    ("6 days per week of study, test in 10 days", 10),
+    ("studying 4 days every week, exams 3 weeks away", 21),
+    ("3 months left until boards", 90),
+    ("5 days a week", None),
+    ("my exams are in 48 hours", 2),
+    ("exam within 12 hours", 1),
+    ("36 hours left until my finals", 2),
+])
+def test_exam_timeline(message, expected):
+    assert extract_fields(message).get("exam_timeline") == expected
+
+@pytest.mark.parametrize("message, expected", [
+    (
+        "College, 4 subjects, 3h a day, exams in 2 weeks, procrastinator",
+        {"education_level": "College", "subjects_count": 4, "study_hours": 3.0,
+         "exam_timeline": 14, "study_habit": "Procrastinator"},
+    ),
+    ("high school, two subjects, 90 minutes daily", {"education_level": "High School", "subjects_count": 2, "study_hours": 1.5}),
+])
+def test_one_shot_profile(message, expected):
+    assert extract_fields(message) == expected
+
+def test_bare_number_answers_expected_field():
+    assert extract_fields("4", expected_field="subjects_count") == {"subjects_count": 4}
+    assert extract_fields("4") == {}
+
+@pytest.mark.parametrize("message, expected_field, expected", [
+    ("I study 3 hours every day", "study_hours", None),
+    ("college, 4 subjects, 3 hours every day, exams in 2 weeks", None, None),
+    ("every day, same time", "study_habit", "Consistent"),
+    ("I'm pretty consistent", None, "Consistent"),
+    ("total procrastinator", None, "Procrastinator"),
+])
+def test_study_habit(message, expected_field, expected):
+    assert extract_fields(message, expected_field).get("study_habit") == expected
+
+@pytest.mark.parametrize("message, hours", [
+    ("my exams are in 48 hours", None),
+    ("exams in 2 weeks, I can do 3 hours a day", 3.0),
+    ("2.5 hrs", 2.5),
+    ("I can study 2 hours, 5 days a week, exams in 3 months", 2.0),
+    ("exams soon, 4 hours", 4.0),
+    ("45 minutes", 0.75),
+])
+def test_study_hours(message, hours):
+    assert extract_fields(message).get("study_hours") == hours
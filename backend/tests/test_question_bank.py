@@ -0,0 +1,22 @@
+import pytest
+
+from question_bank import QuestionBank, clean_topic
+
+@pytest.mark.parametrize("message, topic", [
+    ("Quiz me on photosynthesis!", "photosynthesis"),
+    ("what's the capital of France", "capital france"),
+    ("give me a few questions about World War 2", "world war 2"),
+])
+def test_clean_topic(message, topic):
+    assert clean_topic(message) == topic
+
+def test_lookup_and_backfill(tmp_path):
+    bank = QuestionBank(path=tmp_path, min_hits=1, min_score=0.1)
+    bank._loaded = True  # start empty instead of from the seed file
+    assert bank.lookup("french revolution", count=1) is None
+
+    added = bank.add([{"topic": "french revolution", "question": "When did the Bastille fall?", "answer": "1789", "source": "test"}])
+    assert added == 1
+    assert bank.lookup("french revolution", count=1)[0]["answer"] == "1789"
+    # Duplicates are not added twice
+    assert bank.add([{"topic": "x", "question": "When did the Bastille fall?", "answer": "", "source": "test"}]) == 0
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from resilience import CircuitOpenError, ResilientCaller
+
+def make_caller() -> ResilientCaller:
+    caller = ResilientCaller()
+    caller.max_retries = 0
+    caller.hedge = False
+    caller.breaker.failure_threshold = 1
+    caller.breaker.reset_timeout = 0
+    return caller
+
+async def failing():
+    raise ConnectionError("upstream down")
+
+async def healthy():
+    return "ok"
+
+async def hanging():
+    await asyncio.sleep(10)
+
+def test_cancelled_probe_releases_half_open_breaker():
+    caller = make_caller()
+
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            await caller.call(failing, budget=5)
+        assert caller.breaker.state == "open"
+
+        # The probe is cancelled by an outer deadline, as AIAgent._guarded does
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(caller.call(hanging, budget=5), timeout=0.05)
+        assert caller.breaker.state == "half_open"
+
+        assert await caller.call(healthy, budget=5) == "ok"
+        assert caller.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+def test_open_breaker_rejects_without_calling_upstream():
+    caller = make_caller()
+    caller.breaker.reset_timeout = 60
+    calls = []
+
+    async def counted():
+        calls.append(1)
+        return "ok"
+
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            await caller.call(failing, budget=5)
+        with pytest.raises(CircuitOpenError):
+            await caller.call(counted, budget=5)
+
+    asyncio.run(scenario())
+    assert calls == []
+
+def test_hedge_delay_is_tracked_per_method():
+    caller = make_caller()
+    caller.hedge_min_samples = 5
+
+    async def scenario():
+        for _ in range(10):
+            await caller.call(healthy, budget=5, method="detect_intent")
+
+    asyncio.run(scenario())
+    assert caller.hedge_delay("detect_intent") is not None
+    # Fast intent calls must not set the hedge delay of long generations
+    assert caller.hedge_delay("generate_study_plan") is None
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from session_store import new_state
+from sqlite_store import SqliteSessionStore
+
+def make_state(level: str) -> dict:
+    state = new_state()
+    state["student_data"]["education_level"] = level
+    return state
+
+@pytest.fixture
+def store(tmp_path):
+    return SqliteSessionStore(path=str(tmp_path / "state.db"), flush_interval=60)
+
+def level(state: dict):
+    return state["student_data"].get("education_level")
+
+def test_load_sees_batch_while_it_is_written(store):
+    started, release = threading.Event(), threading.Event()
+    write = store._write
+
+    def slow_write(rows):
+        started.set()
+        release.wait(5)
+        write(rows)
+
+    async def scenario():
+        await store.save("t", make_state("v1"))
+        await store.flush()
+        await store.save("t", make_state("v2"))
+
+        store._write = slow_write
+        flush = asyncio.create_task(store.flush())
+        await asyncio.to_thread(started.wait, 5)
+        in_flight = level(await store.load("t"))
+        release.set()
+        await flush
+        store._write = write
+        after = level(await store.load("t"))
+        await store.close()
+        return in_flight, after
+
+    assert asyncio.run(scenario()) == ("v2", "v2")
+
+def test_failed_write_puts_batch_back(store, tmp_path):
+    write = store._write
+
+    def failing_write(rows):
+        raise RuntimeError("database is locked")
+
+    async def scenario():
+        await store.save("a", make_state("a1"))
+        await store.save("b", make_state("b1"))
+        store._write = failing_write
+        await store.flush()
+        assert store.stats()["pending_writes"] == 2
+        assert level(await store.load("b")) == "b1"
+
+        # A state saved after the failure wins over the put-back one
+        await store.save("a", make_state("a2"))
+        store._write = write
+        await store.flush()
+        assert store.stats()["pending_writes"] == 0
+        await store.close()
+
+    asyncio.run(scenario())
+    reopened = SqliteSessionStore(path=store.path)
+    assert level(asyncio.run(reopened.load("a"))) == "a2"
+    assert level(asyncio.run(reopened.load("b"))) == "b1"
+    asyncio.run(reopened.close())
+
+def test_idle_threads_expire(store):
+    async def scenario():
+        await store.save("old", make_state("v1"))
+        await store.flush()
+        store.idle_ttl = 0.01
+        time.sleep(0.05)
+        assert level(await store.load("old")) is None
+
+        store._prune()
+        assert store.expirations == 1
+        assert store.stats()["live_sessions"] == 0
+        await store.close()
+
+    asyncio.run(scenario())
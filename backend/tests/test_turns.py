@@ -0,0 +1,79 @@
+import asyncio
+import uuid
+
+import graph
+from concurrency import KeyedLock
+
+def test_keyed_lock_serializes_same_key_only():
+    locks = KeyedLock()
+    events = []
+
+    async def hold(key: str, name: str):
+        async with locks.hold(key):
+            events.append(f"{name} start")
+            await asyncio.sleep(0.01)
+            events.append(f"{name} end")
+
+    async def scenario():
+        await asyncio.gather(hold("t1", "a"), hold("t1", "b"), hold("t2", "c"))
+
+    asyncio.run(scenario())
+    assert events.index("a end") < events.index("b start")
+    # Another key does not wait for t1
+    assert events.index("c start") < events.index("a end")
+    assert len(locks) == 0
+
+def fake_turns(monkeypatch):
+    """Replaces the graph run with a slow echo and returns the list of turns it ran."""
+    runs = []
+
+    async def run_turn(message: str, thread_id: str):
+        runs.append(("start", message))
+        await asyncio.sleep(0.02)
+        runs.append(("end", message))
+        return f"reply to {message}"
+
+    monkeypatch.setattr(graph, "_run_turn", run_turn)
+    return runs
+
+def test_concurrent_turns_on_one_thread_run_in_order(monkeypatch):
+    runs = fake_turns(monkeypatch)
+    thread_id = uuid.uuid4().hex
+
+    async def scenario():
+        return await asyncio.gather(
+            graph.run_chat_workflow("first", thread_id),
+            graph.run_chat_workflow("second", thread_id),
+        )
+
+    assert asyncio.run(scenario()) == ["reply to first", "reply to second"]
+    assert runs == [("start", "first"), ("end", "first"), ("start", "second"), ("end", "second")]
+
+def test_retry_with_same_key_joins_the_turn_in_flight(monkeypatch):
+    runs = fake_turns(monkeypatch)
+    thread_id = uuid.uuid4().hex
+
+    async def scenario():
+        first = asyncio.create_task(graph.run_chat_workflow("hello", thread_id, idempotency_key="k1"))
+        await asyncio.sleep(0.005)
+        retry = graph.run_chat_workflow("hello", thread_id, idempotency_key="k1")
+        replies = await asyncio.gather(first, retry)
+        # A later retry gets the stored reply
+        replies.append(await graph.run_chat_workflow("hello", thread_id, idempotency_key="k1"))
+        return replies
+
+    assert asyncio.run(scenario()) == ["reply to hello"] * 3
+    assert runs == [("start", "hello"), ("end", "hello")]
+
+def test_same_key_with_different_text_is_a_new_turn(monkeypatch):
+    runs = fake_turns(monkeypatch)
+    thread_id = uuid.uuid4().hex
+
+    async def scenario():
+        return [
+            await graph.run_chat_workflow("quiz me on calculus", thread_id, idempotency_key="k1"),
+            await graph.run_chat_workflow("I'm so stressed", thread_id, idempotency_key="k1"),
+        ]
+
+    assert asyncio.run(scenario()) == ["reply to quiz me on calculus", "reply to I'm so stressed"]
+    assert len(runs) == 4
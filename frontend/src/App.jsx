@@ -1,5 +1,5 @@
 import React, { useState, useRef, useEffect } from 'react';
-import { chatWithBot } from './api';
+import { createChatSocket } from './api';
 import ReactMarkdown from 'react-markdown';
 import { Send, Trash2, Sparkles, BookOpen, Brain, Clock, Bot } from 'lucide-react';
 
@@ -34,6 +34,13 @@ function App() {
 
   const inputRef = useRef(null);
 
+  // One WebSocket for the whole session instead of a request per message
+  const chatSocket = useRef(null);
+  useEffect(() => {
+    chatSocket.current = createChatSocket(sessionId);
+    return () => chatSocket.current.close();
+  }, [sessionId]);
+
   useEffect(() => {
     // Focus input on load
     inputRef.current?.focus();
@@ -48,6 +55,9 @@ function App() {
   const handleSend = async (msg = input) => {
     if (!msg.trim()) return;
 
+    // One key per send, shared by its retry/fallback so the backend only answers once
+    const idempotencyKey = crypto.randomUUID?.() ?? `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
     const userMessage = { role: 'user', content: msg };
     setMessages(prev => [...prev, userMessage]);
     setInput('');
@@ -57,10 +67,26 @@ function App() {
     setTimeout(() => inputRef.current?.focus(), 10);
 
     try {
-      // Pass the unique sessionId to the backend
-      const botReplyText = await chatWithBot(msg, sessionId);
-      const botMessage = { role: 'bot', content: botReplyText };
-      setMessages(prev => [...prev, botMessage]);
+      // Pass the unique sessionId to the backend and render the reply as it streams in
+      let streamStarted = false;
+      const appendToken = (text) => {
+        if (!streamStarted) {
+          streamStarted = true;
+          setLoading(false);
+          setMessages(prev => [...prev, { role: 'bot', content: text }]);
+          return;
+        }
+        setMessages(prev => {
+          const last = prev[prev.length - 1];
+          return [...prev.slice(0, -1), { ...last, content: last.content + text }];
+        });
+      };
+
+      const botReplyText = await chatSocket.current.send(msg, appendToken, idempotencyKey);
+      // Replace the streamed text with the final response (also covers turns with no tokens)
+      setMessages(prev => streamStarted
+        ? [...prev.slice(0, -1), { role: 'bot', content: botReplyText }]
+        : [...prev, { role: 'bot', content: botReplyText }]);
     } catch (error) {
       setMessages(prev => [...prev, { role: 'bot', content: "Sorry, I'm having trouble connecting right now." }]);
     } finally {
@@ -1,13 +1,13 @@
 const API_URL = import.meta.env.VITE_API_URL || "http://localhost:8000";
 
-export const chatWithBot = async (message, threadId = "default") => {
+export const chatWithBot = async (message, threadId = "default", idempotencyKey = null) => {
     try {
         const response = await fetch(`${API_URL}/chat`, {
             method: "POST",
             headers: {
                 "Content-Type": "application/json",
             },
-            body: JSON.stringify({ message, thread_id: threadId }),
+            body: JSON.stringify({ message, thread_id: threadId, idempotency_key: idempotencyKey }),
         });
 
         if (!response.ok) {
@@ -21,3 +21,144 @@ export const chatWithBot = async (message, threadId = "default") => {
         return "Sorry, I am having trouble connecting to the server.";
     }
 };
+
+// Passing the same `idempotencyKey` again (e.g. on a retry or double submit)
+// returns the original turn's reply instead of sending the message twice.
+
+// Streams the reply over Server-Sent Events from /chat/stream.
+// `onToken` receives each chunk of text as it is generated; the returned
+// promise resolves with the complete response once the server is done.
+export const streamChatWithBot = async (message, threadId = "default", onToken = () => {}, idempotencyKey = null) => {
+    try {
+        const response = await fetch(`${API_URL}/chat/stream`, {
+            method: "POST",
+            headers: {
+                "Content-Type": "application/json",
+                Accept: "text/event-stream",
+            },
+            body: JSON.stringify({ message, thread_id: threadId, idempotency_key: idempotencyKey }),
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error(`Error: ${response.statusText}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        let finalText = "";
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // SSE events are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = "message";
+                let data = "";
+                for (const line of rawEvent.split("\n")) {
+                    if (line.startsWith("event:")) event = line.slice(6).trim();
+                    else if (line.startsWith("data:")) data += line.slice(5).trim();
+                }
+                if (!data) continue;
+
+                const payload = JSON.parse(data);
+                if (event === "token") {
+                    onToken(payload.text);
+                } else if (event === "done") {
+                    finalText = payload.response;
+                } else if (event === "error") {
+                    throw new Error(payload.detail);
+                }
+            }
+        }
+
+        return finalText;
+    } catch (error) {
+        console.error("API Error:", error);
+        return "Sorry, I am having trouble connecting to the server.";
+    }
+};
+
+// One WebSocket per chat session on /ws/{threadId}. The server acknowledges
+// each message, pushes its tokens as they are generated and then the final
+// reply, and pings periodically (answered here). `send` resolves with the
+// complete response; if the socket cannot be (re)opened or drops mid-turn it
+// falls back to streamChatWithBot with the same id, which doubles as the
+// idempotency key so the turn is never run twice.
+export const createChatSocket = (threadId = "default") => {
+    const url = `${API_URL.replace(/^http/, "ws")}/ws/${encodeURIComponent(threadId)}`;
+    const pending = new Map(); // message id -> { onToken, resolve, reject, received }
+    let socket = null;
+    let opening = null;
+
+    const connect = () => {
+        if (socket && socket.readyState === WebSocket.OPEN) return Promise.resolve(socket);
+        if (opening) return opening;
+        opening = new Promise((resolve, reject) => {
+            const ws = new WebSocket(url);
+            ws.onopen = () => {
+                socket = ws;
+                opening = null;
+                resolve(ws);
+            };
+            ws.onerror = () => {
+                opening = null;
+                reject(new Error("WebSocket connection failed"));
+            };
+            ws.onmessage = (event) => {
+                const payload = JSON.parse(event.data);
+                if (payload.type === "ping") {
+                    ws.send(JSON.stringify({ type: "pong" }));
+                    return;
+                }
+                const turn = pending.get(payload.id);
+                if (!turn) return;
+                if (payload.type === "token") {
+                    turn.received = true;
+                    turn.onToken(payload.text);
+                } else if (payload.type === "done") {
+                    pending.delete(payload.id);
+                    turn.resolve(payload.response);
+                } else if (payload.type === "error") {
+                    pending.delete(payload.id);
+                    turn.reject(new Error(payload.detail));
+                }
+            };
+            ws.onclose = () => {
+                if (socket === ws) socket = null;
+                for (const turn of pending.values()) turn.reject(new Error("Connection closed"));
+                pending.clear();
+            };
+        });
+        return opening;
+    };
+
+    const send = async (message, onToken = () => {}, id = null) => {
+        const messageId = id || `${threadId}-${Date.now()}-${Math.random().toString(36).slice(2, 9)}`;
+        const turn = { onToken, received: false };
+        try {
+            const ws = await connect();
+            return await new Promise((resolve, reject) => {
+                Object.assign(turn, { resolve, reject });
+                pending.set(messageId, turn);
+                ws.send(JSON.stringify({ type: "message", id: messageId, message }));
+            });
+        } catch (error) {
+            console.error("WebSocket Error:", error);
+            // Tokens already shown are not repeated; the final response replaces them
+            return streamChatWithBot(message, threadId, turn.received ? () => {} : onToken, messageId);
+        }
+    };
+
+    const close = () => {
+        if (socket) socket.close();
+    };
+
+    return { send, close };
+};
@@ -1,5 +1,6 @@
 import google.generativeai as genai
 import os
+import sys
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -14,8 +15,15 @@ else:
     genai.configure(api_key=api_key)
     print("Available models:")
     try:
+        names = []
         for m in genai.list_models():
             if 'generateContent' in m.supported_generation_methods:
                 print(m.name)
+                names.append(m.name)
+        # `--save` refreshes models.txt, the catalogue the backend checks model names against
+        if "--save" in sys.argv:
+            catalogue = Path(__file__).parent / 'models.txt'
+            catalogue.write_text("Available models:\n" + "\n".join(names) + "\n")
+            print(f"Saved {len(names)} models to {catalogue}")
     except Exception as e:
         print(f"Error listing models: {e}")